@@ -0,0 +1,256 @@
+'''
+Lockstep simulator for many independent tables of Bounty Hold'em.
+
+Every table's state lives in NumPy arrays and each step applies one action per table,
+so legality, raise bounds, showdowns and bounty payouts are computed in batch. The
+rules follow engine.RoundState exactly, including get_delta's rounding by button parity:
+
+    sim = BatchSim(4096, seed=0)
+    observation = sim.reset()
+    while not sim.done.all():
+        actions = np.where(observation['legal'][:, CHECK], CHECK, CALL)
+        observation, rewards, dones = sim.step(actions)
+
+Actions are FOLD, CALL, CHECK or RAISE with a raise-to amount. An illegal action falls
+back to a check, or a fold if checking is illegal, as the engine does for bad responses.
+Cards are 0-51 indices, suit * 13 + rank; bounties are ranks 0-12, or -1 for none.
+'''
+import os
+import sys
+
+import numpy as np
+
+from config import STARTING_STACK, BIG_BLIND, SMALL_BLIND, BOUNTY_RATIO, BOUNTY_CONSTANT
+
+# the evaluator ships with the pokerbot, so the simulator shares its one copy
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python_skeleton'))
+from evaluator import evaluate
+
+FOLD, CALL, CHECK, RAISE = 0, 1, 2, 3
+
+
+class BatchSim():
+    '''
+    Steps num_tables rounds in lockstep.
+
+    State arrays, one row per table: button, street, pips and stacks (by seat), cards
+    (seat 0 hand, seat 1 hand, board), bounties (by seat), done and deltas (by seat,
+    set when the round ends).
+    '''
+
+    def __init__(self, num_tables, seed=None):
+        self.num_tables = num_tables
+        self.rng = np.random.default_rng(seed)
+        self.button = np.zeros(num_tables, dtype=np.int64)
+        self.street = np.zeros(num_tables, dtype=np.int64)
+        self.pips = np.zeros((num_tables, 2), dtype=np.int64)
+        self.stacks = np.zeros((num_tables, 2), dtype=np.int64)
+        self.cards = np.zeros((num_tables, 9), dtype=np.int64)
+        self.bounties = np.full((num_tables, 2), -1, dtype=np.int64)
+        self.done = np.ones(num_tables, dtype=bool)
+        self.deltas = np.zeros((num_tables, 2), dtype=np.int64)
+        self.hole_ranks = np.zeros((num_tables, 2), dtype=np.int64)
+        self.board_ranks = np.zeros((num_tables, 6), dtype=np.int64)
+        self.bounty_bits = np.zeros((num_tables, 2), dtype=np.int64)
+        self.rows = np.arange(num_tables)
+
+    def reset(self, tables=None, cards=None, bounties=None):
+        '''
+        Deals new rounds to the given tables (a boolean mask or indices; all by default).
+
+        cards (n, 9) and bounties (n, 2) fix the deals instead of drawing them at random.
+        Returns the observation of every table.
+        '''
+        tables = self.rows if tables is None else self.rows[tables]
+        count = len(tables)
+        if cards is None:
+            cards = np.argsort(self.rng.random((count, 52)), axis=1)[:, :9]
+        if bounties is None:
+            bounties = self.rng.integers(0, 13, (count, 2))
+        cards = np.asarray(cards, dtype=np.int64)
+        bounties = np.asarray(bounties, dtype=np.int64)
+        self.button[tables] = 0
+        self.street[tables] = 0
+        self.pips[tables] = [SMALL_BLIND, BIG_BLIND]
+        self.stacks[tables] = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.cards[tables] = cards
+        self.bounties[tables] = bounties
+        self.done[tables] = False
+        self.deltas[tables] = 0
+        rank_bits = 1 << (cards % 13)
+        self.hole_ranks[tables, 0] = rank_bits[:, 0] | rank_bits[:, 1]
+        self.hole_ranks[tables, 1] = rank_bits[:, 2] | rank_bits[:, 3]
+        board_ranks = np.zeros((count, 6), dtype=np.int64)
+        board_ranks[:, 3] = rank_bits[:, 4] | rank_bits[:, 5] | rank_bits[:, 6]
+        board_ranks[:, 4] = board_ranks[:, 3] | rank_bits[:, 7]
+        board_ranks[:, 5] = board_ranks[:, 4] | rank_bits[:, 8]
+        self.board_ranks[tables] = board_ranks
+        self.bounty_bits[tables] = np.where((bounties >= 0) & (bounties < 13), 1 << np.clip(bounties, 0, 12), 0)
+        return self.observation()
+
+    def observation(self):
+        '''
+        Returns the public state of every table as a dict of arrays.
+
+        board masks the cards not yet dealt with -1.
+        '''
+        board = np.where(np.arange(5) < self.street[:, None], self.cards[:, 4:], -1)
+        min_raise, max_raise = self.raise_bounds()
+        return {
+            'active': self.button % 2,
+            'button': self.button.copy(),
+            'street': self.street.copy(),
+            'pips': self.pips.copy(),
+            'stacks': self.stacks.copy(),
+            'hands': self.cards[:, :4].reshape(-1, 2, 2),
+            'board': board,
+            'bounties': self.bounties.copy(),
+            'legal': self.legal_actions(),
+            'min_raise': min_raise,
+            'max_raise': max_raise,
+            'done': self.done.copy(),
+        }
+
+    def bounty_hits(self, tables=None):
+        '''
+        Returns (n, 2) booleans: whether each seat's bounty rank is in its hand or on the
+        board dealt so far, for the given tables (all by default).
+        '''
+        tables = self.rows if tables is None else tables
+        board_ranks = self.board_ranks[tables, self.street[tables]]
+        return (self.bounty_bits[tables] & (self.hole_ranks[tables] | board_ranks[:, None])) != 0
+
+    def get_delta(self, winner, tables):
+        '''
+        Returns seat 0's delta for the given tables after bounty rules, where winner is
+        0, 1 or 2 (split pot) per table.
+        '''
+        stacks = self.stacks[tables]
+        hits = self.bounty_hits(tables)
+        delta = np.where(winner == 0, STARTING_STACK - stacks[:, 1], stacks[:, 0] - STARTING_STACK).astype(np.float64)
+        delta = np.where((winner == 0) & hits[:, 0], delta * BOUNTY_RATIO + BOUNTY_CONSTANT, delta)
+        delta = np.where((winner == 1) & hits[:, 1], delta * BOUNTY_RATIO - BOUNTY_CONSTANT, delta)
+        split = (STARTING_STACK - stacks[:, 0]) * (BOUNTY_RATIO - 1) / 2 + BOUNTY_CONSTANT
+        delta = np.where(winner == 2, np.where(hits[:, 0] != hits[:, 1], split, 0.), delta)
+        # if delta is not an integer, round it down or up depending on who's in position
+        fractional = np.abs(delta - np.floor(delta)) > 1e-6
+        rounded = np.where(self.button[tables] % 2 == 0, np.floor(delta), np.ceil(delta))
+        return np.where(fractional, rounded, delta).astype(np.int64)
+
+    def legal_actions(self):
+        '''
+        Returns (n, 4) booleans indexed by FOLD, CALL, CHECK and RAISE. Finished tables have none.
+        '''
+        active = self.button % 2
+        own_pip = self.pips[self.rows, active]
+        own_stack = self.stacks[self.rows, active]
+        other_stack = self.stacks[self.rows, 1 - active]
+        continue_cost = self.pips[self.rows, 1 - active] - own_pip
+        facing = continue_cost > 0
+        bets_forbidden = (self.stacks[:, 0] == 0) | (self.stacks[:, 1] == 0)
+        raises_forbidden = (continue_cost == own_stack) | (other_stack == 0)
+        legal = np.empty((self.num_tables, 4), dtype=bool)
+        legal[:, FOLD] = facing
+        legal[:, CALL] = facing
+        legal[:, CHECK] = ~facing
+        legal[:, RAISE] = np.where(facing, ~raises_forbidden, ~bets_forbidden)
+        legal[self.done] = False
+        return legal
+
+    def raise_bounds(self):
+        '''
+        Returns arrays of the minimum and maximum legal raise-to amounts.
+        '''
+        active = self.button % 2
+        own_pip = self.pips[self.rows, active]
+        continue_cost = self.pips[self.rows, 1 - active] - own_pip
+        max_contribution = np.minimum(self.stacks[self.rows, active], self.stacks[self.rows, 1 - active] + continue_cost)
+        min_contribution = np.minimum(max_contribution, continue_cost + np.maximum(continue_cost, BIG_BLIND))
+        return own_pip + min_contribution, own_pip + max_contribution
+
+    def finish(self, tables, delta):
+        '''
+        Ends the rounds of the given tables with seat 0's delta.
+        '''
+        self.deltas[tables, 0] = delta
+        self.deltas[tables, 1] = -delta
+        self.done[tables] = True
+
+    def showdown(self, tables):
+        '''
+        Compares the hands of the given tables and pays them out.
+        '''
+        cards = self.cards[tables]
+        score0 = evaluate(cards[:, [0, 1, 4, 5, 6, 7, 8]])
+        score1 = evaluate(cards[:, [2, 3, 4, 5, 6, 7, 8]])
+        winner = np.where(score0 > score1, 0, np.where(score0 < score1, 1, 2))
+        self.finish(tables, self.get_delta(winner, tables))
+
+    def proceed_street(self, tables):
+        '''
+        Resets the pips of the given tables and advances them to the next round of betting.
+        '''
+        river = self.street[tables] == 5
+        if river.any():
+            self.showdown(tables[river])
+        tables = tables[~river]
+        self.button[tables] = 1
+        self.street[tables] = np.where(self.street[tables] == 0, 3, self.street[tables] + 1)
+        self.pips[tables] = 0
+
+    def step(self, actions, amounts=None):
+        '''
+        Applies one action to every unfinished table; finished tables are left unchanged.
+
+        actions holds FOLD, CALL, CHECK or RAISE per table and amounts the raise-to
+        amounts. Returns the observation, the (n, 2) deltas of the rounds that ended in
+        this step (zero elsewhere) and the tables that ended in this step.
+        '''
+        actions = np.asarray(actions, dtype=np.int64)
+        amounts = np.zeros(self.num_tables, dtype=np.int64) if amounts is None else np.asarray(amounts, dtype=np.int64)
+        was_done = self.done.copy()
+        legal = self.legal_actions()
+        min_raise, max_raise = self.raise_bounds()
+        valid = legal[self.rows, np.clip(actions, 0, 3)] & (actions >= 0) & (actions <= 3)
+        valid &= (actions != RAISE) | ((min_raise <= amounts) & (amounts <= max_raise))
+        actions = np.where(valid, actions, np.where(legal[:, CHECK], CHECK, FOLD))
+        live = ~was_done
+        active = self.button % 2
+
+        folds = self.rows[live & (actions == FOLD)]
+        if len(folds):
+            self.finish(folds, self.get_delta(1 - active[folds], folds))  # if active folds, the other player wins
+
+        checks = live & (actions == CHECK)
+        both_acted = ((self.street == 0) & (self.button > 0)) | (self.button > 1)
+        check_streets = self.rows[checks & both_acted]
+        check_waits = self.rows[checks & ~both_acted]
+        calls = live & (actions == CALL)
+        blinds = self.rows[calls & (self.button == 0)]
+        call_streets = self.rows[calls & (self.button > 0)]
+
+        self.button[check_waits] += 1  # let opponent act
+
+        # sb calls bb
+        self.button[blinds] = 1
+        self.pips[blinds] = BIG_BLIND
+        self.stacks[blinds] = STARTING_STACK - BIG_BLIND
+
+        # both players acted
+        call_active = active[call_streets]
+        contribution = self.pips[call_streets, 1 - call_active] - self.pips[call_streets, call_active]
+        self.stacks[call_streets, call_active] -= contribution
+        self.pips[call_streets, call_active] += contribution
+        self.button[call_streets] += 1
+
+        raises = self.rows[live & (actions == RAISE)]
+        raise_active = active[raises]
+        contribution = amounts[raises] - self.pips[raises, raise_active]
+        self.stacks[raises, raise_active] -= contribution
+        self.pips[raises, raise_active] += contribution
+        self.button[raises] += 1
+
+        self.proceed_street(np.concatenate([check_streets, call_streets]))
+        dones = self.done & ~was_done
+        rewards = np.where(dones[:, None], self.deltas, 0)
+        return self.observation(), rewards, dones
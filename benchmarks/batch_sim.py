@@ -0,0 +1,41 @@
+'''
+Throughput of the lockstep batch simulator under a random policy.
+
+Run from anywhere with: python benchmarks/batch_sim.py [tables] [batches] [seed]
+'''
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+from batch_sim import BatchSim
+
+
+def main():
+    num_tables = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    rng = np.random.default_rng(seed)
+    sim = BatchSim(num_tables, seed=seed)
+    steps = 0
+    start_time = time.perf_counter()
+    for _ in range(batches):
+        observation = sim.reset()
+        while not sim.done.all():
+            # a random legal action per table, raising to a random legal amount
+            weights = observation['legal'] * rng.random((num_tables, 4)) * [0.2, 1., 1., 0.5]
+            actions = weights.argmax(axis=1)
+            amounts = rng.integers(observation['min_raise'], np.maximum(observation['min_raise'], observation['max_raise']) + 1)
+            observation, rewards, dones = sim.step(actions, amounts)
+            steps += 1
+    elapsed = time.perf_counter() - start_time
+    print('{} tables x {} batches: {:.0f} hands/s, {:.1f} ms/step'.format(
+        num_tables, batches, num_tables * batches / elapsed, 1000 * elapsed / steps))
+
+
+if __name__ == '__main__':
+    main()
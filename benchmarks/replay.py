@@ -0,0 +1,22 @@
+'''
+Replays recorded engine packets into a skeleton Runner without a socket, for the
+benchmark suite and the tests.
+'''
+
+
+class ReplayFile():
+    '''
+    A socket file that replays recorded engine packets and discards responses.
+    '''
+
+    def __init__(self, packets):
+        self.lines = iter(packets)
+
+    def readline(self):
+        return next(self.lines, 'Q') + '\n'
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
@@ -0,0 +1,82 @@
+'''
+Microbenchmark of the engine's round state: random playouts through the immutable
+RoundState chain and through MutableRoundState, checking that both pay the same deltas.
+
+Run from anywhere with: python benchmarks/round_state.py [rounds] [seed]
+'''
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+import eval7
+from engine import RoundState, MutableRoundState, TerminalState, FoldAction, CallAction, CheckAction, RaiseAction, \
+    CARD_NAMES, SMALL_BLIND, BIG_BLIND, STARTING_STACK
+
+
+def deal(rng):
+    '''
+    Returns the hands, deck, bounties and action choices of one random round.
+    '''
+    deck = eval7.Deck()
+    rng.shuffle(deck.cards)
+    hands = [deck.deal(2), deck.deal(2)]
+    bounties = [rng.choice(CARD_NAMES), rng.choice(CARD_NAMES)]
+    choices = [rng.random() for _ in range(64)]
+    return hands, deck, bounties, choices
+
+
+def choose(round_state, choice):
+    '''
+    Maps a uniform random number to a legal action.
+    '''
+    legal_actions = round_state.legal_actions()
+    if RaiseAction in legal_actions and choice < 0.3:
+        min_raise, max_raise = round_state.raise_bounds()
+        return RaiseAction(min_raise + int((max_raise - min_raise) * choice / 0.3))
+    if FoldAction in legal_actions and choice > 0.9:
+        return FoldAction()
+    return CallAction() if CallAction in legal_actions else CheckAction()
+
+
+def play_immutable(hands, deck, bounties, choices):
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    round_state = RoundState(0, 0, pips, stacks, hands, deck, bounties, None)
+    for choice in choices:
+        round_state = round_state.proceed(choose(round_state, choice))
+        if isinstance(round_state, TerminalState):
+            return round_state.deltas
+    raise RuntimeError('round did not finish')
+
+
+def play_mutable(hands, deck, bounties, choices):
+    round_state = MutableRoundState(hands, deck, bounties)
+    for choice in choices:
+        round_state = round_state.proceed(choose(round_state, choice))
+        if isinstance(round_state, TerminalState):
+            return round_state.deltas
+    raise RuntimeError('round did not finish')
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+    deals = [deal(rng) for _ in range(rounds)]
+    results = {}
+    for name, play in (('RoundState', play_immutable), ('MutableRoundState', play_mutable)):
+        start_time = time.perf_counter()
+        results[name] = [play(*round_deal) for round_deal in deals]
+        elapsed = time.perf_counter() - start_time
+        print('{:<18} {:>10.0f} rounds/s'.format(name, rounds / elapsed))
+    assert results['RoundState'] == results['MutableRoundState'], 'deltas differ'
+    print('deltas match over', rounds, 'rounds')
+
+
+if __name__ == '__main__':
+    main()
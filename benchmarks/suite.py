@@ -0,0 +1,381 @@
+'''
+Benchmark suite for the engine and skeleton hot paths.
+
+    python benchmarks/suite.py run [-k PATTERN] [--repeat N] [--scale X] [--output FILE]
+    python benchmarks/suite.py compare [BASELINE [CURRENT]] [--threshold FRACTION]
+
+run prints every metric and can save them as a JSON baseline. compare checks a run (or
+a fresh one if CURRENT is omitted) against a baseline, by default the committed
+benchmarks/baselines/MACHINE.json for this platform.machine(), flags every metric that
+is worse by more than the threshold and exits with status 1 if any is. Each metric
+keeps the best of --repeat runs.
+
+Metrics are throughputs (higher is better) or per-call times in microseconds (lower is
+better). Games run in a temporary directory so no logs are left in the tree.
+'''
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+import eval7
+import engine
+from engine import RoundState, MutableRoundState, TerminalState, Player, InProcessPlayer, Game, DealStream, \
+    FoldAction, CallAction, CheckAction, RaiseAction, import_pokerbot
+import round_state as round_state_benchmark
+from replay import ReplayFile
+
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+BENCHMARKS = []
+
+
+def benchmark(function):
+    '''
+    Registers a benchmark. It takes a scale factor and returns {metric: (value, unit)}.
+    '''
+    BENCHMARKS.append(function)
+    return function
+
+
+def higher_is_better(unit):
+    return unit.endswith('/s')
+
+
+def rate(count, seconds):
+    return count / seconds
+
+
+def micros(count, seconds):
+    return 1e6 * seconds / count
+
+
+class ScriptedPlayer(Player):
+    '''
+    Answers queries in memory with a seeded policy, optionally recording the packets
+    the engine would have sent and the actions it answered with.
+    '''
+
+    def __init__(self, name, log_filename, seed, record=False):
+        super().__init__(name, '.', log_filename)
+        self.rng = random.Random(seed)
+        self.record = record
+        self.packets = []
+        self.responses = []
+
+    def query(self, round_state, player_message, game_log):
+        player_message[0] = 'T{:.3f}'.format(self.game_clock)
+        if self.record:
+            self.packets.append(' '.join(player_message))
+        del player_message[1:]
+        if isinstance(round_state, TerminalState):
+            return CheckAction()
+        action = round_state_benchmark.choose(round_state, self.rng.random())
+        if self.record:
+            self.responses.append(action)
+        return action
+
+
+def play_scripted(directory, num_rounds, seed, record=False):
+    '''
+    Plays num_rounds rounds between two ScriptedPlayers. Returns the players and the seconds taken.
+    '''
+    game = Game(os.path.join(directory, 'gamelog'))
+    players = [ScriptedPlayer('A', os.path.join(directory, 'A.txt'), seed, record),
+               ScriptedPlayer('B', os.path.join(directory, 'B.txt'), seed + 1, record)]
+    start_time = time.perf_counter()
+    players = game.run_rounds(players, 1, num_rounds, DealStream(seed))
+    elapsed = time.perf_counter() - start_time
+    game.log.close()
+    for player in players:
+        player.player_log.close()
+    return sorted(players, key=lambda player: player.name), elapsed
+
+
+@benchmark
+def round_state_playouts(scale):
+    rounds = int(20000 * scale)
+    rng = random.Random(0)
+    deals = [round_state_benchmark.deal(rng) for _ in range(rounds)]
+    results = {}
+    for name, play in (('round_state.playout', round_state_benchmark.play_mutable),
+                       ('round_state.playout_namedtuple', round_state_benchmark.play_immutable)):
+        start_time = time.perf_counter()
+        for round_deal in deals:
+            play(*round_deal)
+        results[name] = (rate(rounds, time.perf_counter() - start_time), 'rounds/s')
+    return results
+
+
+@benchmark
+def round_state_methods(scale):
+    '''
+    Times the RoundState methods on states sampled from random playouts.
+    '''
+    rng = random.Random(1)
+    states = []
+    rivers = []
+    while len(states) < 2000:
+        hands, deck, bounties, choices = round_state_benchmark.deal(rng)
+        round_state = MutableRoundState(hands, deck, bounties)
+        for choice in choices:
+            states.append(RoundState(round_state.button, round_state.street, list(round_state.pips),
+                                     list(round_state.stacks), hands, deck, bounties, None))
+            action = round_state_benchmark.choose(round_state, choice)
+            if round_state.street == 5 and isinstance(action, CheckAction) and round_state.button > 1:
+                rivers.append(states[-1])
+            round_state = round_state.proceed(action)
+            if isinstance(round_state, TerminalState):
+                break
+    rivers = [state for state in rivers if state.stacks[0] == state.stacks[1]] or [states[-1]]
+    repeats = max(1, int(50 * scale))
+    results = {}
+    for name, method, targets in (('legal_actions', RoundState.legal_actions, states),
+                                  ('raise_bounds', RoundState.raise_bounds, states),
+                                  ('get_delta', lambda state: state.get_delta(0), states),
+                                  ('showdown', RoundState.showdown, rivers)):
+        count = 0
+        start_time = time.perf_counter()
+        for _ in range(repeats if name != 'showdown' else max(1, repeats // 5)):
+            for state in targets:
+                method(state)
+            count += len(targets)
+        results['round_state.' + name] = (rate(count, time.perf_counter() - start_time), 'calls/s')
+    proceed_count = 0
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for state in states:
+            state.proceed(CallAction() if CallAction in state.legal_actions() else CheckAction())
+        proceed_count += len(states)
+    results['round_state.proceed'] = (rate(proceed_count, time.perf_counter() - start_time), 'calls/s')
+    return results
+
+
+@benchmark
+def game_rounds(scale):
+    '''
+    Game.run_rounds with in-memory bots, so only the engine's own work is timed.
+    '''
+    rounds = int(5000 * scale)
+    directory = tempfile.mkdtemp()
+    try:
+        _, elapsed = play_scripted(directory, rounds, 2)
+    finally:
+        shutil.rmtree(directory)
+    return {'game.run_rounds': (rate(rounds, elapsed), 'rounds/s')}
+
+
+@benchmark
+def runner_parse(scale):
+    '''
+    The skeleton Runner's parse loop on packets recorded from a scripted match, with a
+    bot that replays the recorded actions.
+    '''
+    rounds = int(2000 * scale)
+    directory = tempfile.mkdtemp()
+    try:
+        players, _ = play_scripted(directory, rounds, 3, record=True)
+    finally:
+        shutil.rmtree(directory)
+    player_module, _ = import_pokerbot(os.path.join(ROOT, 'python_skeleton'))
+    runner_class = player_module.run_bot.__globals__['Runner']  # import_pokerbot evicts the skeleton modules
+
+    class ReplayBot(player_module.Bot):
+        def __init__(self, responses):
+            self.responses = iter(responses)
+
+        def handle_new_round(self, game_state, round_state, active):
+            pass
+
+        def handle_round_over(self, game_state, terminal_state, active):
+            pass
+
+        def get_action(self, game_state, round_state, active):
+            action = next(self.responses)
+            return getattr(player_module, type(action).__name__)(*action)
+
+    packets = players[0].packets + ['Q']
+    start_time = time.perf_counter()
+    runner_class(ReplayBot(players[0].responses), ReplayFile(packets)).run()
+    elapsed = time.perf_counter() - start_time
+    return {'runner.run': (rate(len(packets), elapsed), 'packets/s')}
+
+
+@benchmark
+def skeleton_get_action(scale):
+    '''
+    python_skeleton's get_action per street, playing the default bot in process.
+    '''
+    rounds = int(300 * scale)
+    directory = tempfile.mkdtemp()
+    timings = {}
+    try:
+        game = Game(os.path.join(directory, 'gamelog'))
+        players = [InProcessPlayer('A', os.path.join(ROOT, 'python_skeleton'), os.path.join(directory, 'A.txt')),
+                   InProcessPlayer('B', os.path.join(ROOT, 'default'), os.path.join(directory, 'B.txt'))]
+        for player in players:
+            player.build()
+            player.run()
+        pokerbot = players[0].pokerbot
+        get_action = pokerbot.get_action
+
+        def timed_get_action(game_state, round_state, active):
+            start_time = time.perf_counter()
+            action = get_action(game_state, round_state, active)
+            timing = timings.setdefault(round_state.street, [0, 0.])
+            timing[0] += 1
+            timing[1] += time.perf_counter() - start_time
+            return action
+
+        pokerbot.get_action = timed_get_action
+        players = game.run_rounds(players, 1, rounds, DealStream(4))
+        for player in players:
+            player.stop()
+        game.log.close()
+    finally:
+        shutil.rmtree(directory)
+    return {'python_skeleton.get_action.street{}'.format(street): (micros(count, seconds), 'us')
+            for street, (count, seconds) in sorted(timings.items())}
+
+
+@benchmark
+def end_to_end(scale):
+    '''
+    Rounds per second between python_skeleton and the default bot, as subprocesses
+    over TRANSPORT and in process.
+    '''
+    rounds = int(300 * scale)
+    results = {}
+    for name, player_class in (('end_to_end.subprocess', Player), ('end_to_end.headless', InProcessPlayer)):
+        directory = tempfile.mkdtemp()
+        try:
+            game = Game(os.path.join(directory, 'gamelog'))
+            players = [player_class('A', os.path.join(ROOT, 'python_skeleton'), os.path.join(directory, 'A.txt')),
+                       player_class('B', os.path.join(ROOT, 'default'), os.path.join(directory, 'B.txt'))]
+            for player in players:
+                player.build()
+                player.run()
+            start_time = time.perf_counter()
+            players = game.run_rounds(players, 1, rounds, DealStream(5))
+            results[name] = (rate(rounds, time.perf_counter() - start_time), 'rounds/s')
+            for player in players:
+                player.stop()
+            game.log.close()
+        finally:
+            shutil.rmtree(directory)
+    return results
+
+
+@benchmark
+def batch_simulation(scale):
+    import numpy as np
+    from batch_sim import BatchSim, CHECK, CALL
+    num_tables = 4096
+    batches = max(1, int(5 * scale))
+    sim = BatchSim(num_tables, seed=0)
+    start_time = time.perf_counter()
+    for _ in range(batches):
+        observation = sim.reset()
+        while not sim.done.all():
+            observation, _, _ = sim.step(np.where(observation['legal'][:, CHECK], CHECK, CALL))
+    return {'batch_sim.hands': (rate(num_tables * batches, time.perf_counter() - start_time), 'hands/s')}
+
+
+def run(pattern='*', repeat=3, scale=1.):
+    '''
+    Runs the matching benchmarks and returns the report, keeping each metric's best run.
+    '''
+    metrics = {}
+    for function in BENCHMARKS:
+        if not fnmatch.fnmatch(function.__name__, pattern):
+            continue
+        names = set()
+        for _ in range(repeat):
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull  # keep bot and engine chatter out of the report
+                try:
+                    results = function(scale)
+                finally:
+                    sys.stdout = stdout
+            for metric, (value, unit) in results.items():
+                names.add(metric)
+                best = metrics.get(metric)
+                if best is None or (value > best['value']) == higher_is_better(unit):
+                    metrics[metric] = {'value': value, 'unit': unit}
+        for metric in sorted(names):
+            print('{:<44} {:>14.1f} {}'.format(metric, metrics[metric]['value'], metrics[metric]['unit']))
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'scale': scale, 'metrics': metrics}
+
+
+def compare(baseline, current, threshold):
+    '''
+    Prints each metric's change against the baseline. Returns the regressed metrics.
+    '''
+    regressions = []
+    if baseline.get('scale') != current.get('scale'):
+        print('Warning: baseline ran at scale', baseline.get('scale'), 'and this run at', current.get('scale'))
+    for metric in sorted(set(baseline['metrics']) | set(current['metrics'])):
+        if metric not in baseline['metrics'] or metric not in current['metrics']:
+            print('{:<44} {}'.format(metric, 'only in baseline' if metric in baseline['metrics'] else 'new'))
+            continue
+        old = baseline['metrics'][metric]
+        new = current['metrics'][metric]
+        change = new['value'] / old['value'] - 1 if old['value'] else 0.
+        worse = -change if higher_is_better(new['unit']) else change
+        flag = 'REGRESSION' if worse > threshold else 'improved' if worse < -threshold else ''
+        if flag == 'REGRESSION':
+            regressions.append(metric)
+        print('{:<44} {:>14.1f} -> {:>14.1f} {:<9} {:+7.1%} {}'.format(
+            metric, old['value'], new['value'], new['unit'], change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/suite.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    compare_parser = commands.add_parser('compare', help='Compare a run against a baseline')
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument('-k', dest='pattern', default='*', help='Only run benchmarks matching this glob')
+        subparser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, defaults to 3')
+        subparser.add_argument('--scale', type=float, default=1., help='Work per run, defaults to 1')
+    run_parser.add_argument('--output', help='Save the results as JSON, e.g. benchmarks/baselines/MACHINE.json')
+    compare_parser.add_argument('baseline', nargs='?', default=os.path.join(BASELINE_DIR, platform.machine() + '.json'),
+                                help='Baseline JSON, defaults to the one saved for this machine type')
+    compare_parser.add_argument('current', nargs='?', help='Results JSON to compare, defaults to a fresh run')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Flagged slowdown, defaults to 0.1')
+    args = parser.parse_args()
+    if args.command == 'run':
+        report = run(args.pattern, args.repeat, args.scale)
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w') as report_file:
+                json.dump(report, report_file, indent=1)
+            print('Wrote', args.output)
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if args.current:
+        with open(args.current) as current_file:
+            current = json.load(current_file)
+    else:
+        current = run(args.pattern, args.repeat, args.scale)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(len(regressions), 'regressions beyond {:.0%}'.format(args.threshold))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
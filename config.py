@@ -7,13 +7,54 @@ PLAYER_2_NAME = "B"
 PLAYER_2_PATH = "./default"  # Change this to './player_chatbot' to interact with your own bot!
 # GAME PROGRESS IS RECORDED HERE
 GAME_LOG_FILENAME = "gamelog"
+# GAME_LOG_COMPRESSION IS None, 'gzip' OR 'lzma' (WHICH APPEND .gz OR .xz TO THE FILENAME)
+GAME_LOG_COMPRESSION = None
+# GAME_LOG_VERBOSITY: 0 LOGS ONLY THE FINAL RESULT (EFFECTIVELY OFF), 1 ADDS A SUMMARY PER ROUND, 2 LOGS EVERY ACTION
+# LINES ABOVE THE VERBOSITY ARE NEVER FORMATTED, SO LOWER LEVELS ALSO SAVE ENGINE CPU
+GAME_LOG_VERBOSITY = 2
+# HAND_HISTORY ALSO WRITES ONE FIXED-WIDTH BINARY RECORD PER ROUND TO GAME_LOG_FILENAME.hh (SEE hand_history.py)
+HAND_HISTORY = False
+# LATENCY_REPORT WRITES PER-QUERY LATENCY HISTOGRAMS AND GAME CLOCK BURN CURVES TO GAME_LOG_FILENAME.latency.json
+LATENCY_REPORT = False
 # PLAYER_LOG_SIZE_LIMIT IS IN BYTES
 PLAYER_LOG_SIZE_LIMIT = 524288
+# PLAYER_LOG_RETENTION IS 'head' TO KEEP THE FIRST PLAYER_LOG_SIZE_LIMIT BYTES OF OUTPUT OR 'tail' TO KEEP THE LAST
+PLAYER_LOG_RETENTION = 'head'
 # STARTING_GAME_CLOCK AND TIMEOUTS ARE IN SECONDS
 ENFORCE_GAME_CLOCK = True
 STARTING_GAME_CLOCK = 60.0
 BUILD_TIMEOUT = 10.0
 CONNECT_TIMEOUT = 10.0
+# TRANSPORT IS 'tcp', 'unix' (A UNIX DOMAIN SOCKET) OR 'socketpair' (A SOCKET INHERITED BY THE POKERBOT)
+# 'unix' AND 'socketpair' NEED A SKELETON THAT ACCEPTS --unix AND --fd; THEY FALL BACK TO 'tcp' OFF POSIX
+TRANSPORT = 'tcp'
+# WARM_POOL STARTS EACH POKERBOT ONCE AS A FORK SERVER AND FORKS A FRESH COPY FOR EVERY MATCH (POSIX ONLY)
+# THE SERVER'S OWN OUTPUT GOES TO <PLAYER_NAME>.pool.txt
+# ONLY match_host.py AND DUPLICATE MATCHES START A POKERBOT MORE THAN ONCE; A SINGLE MATCH OR SHARD IGNORES WARM_POOL
+WARM_POOL = False
+# PIPELINE_ROUNDS SENDS EACH ROUND'S RESULT WITH THE NEXT DEAL INSTEAD OF WAITING FOR AN ACK, FOR RUNNERS THAT AGREE TO IT
+PIPELINE_ROUNDS = False
+# HEADLESS RUNS BOTH POKERBOTS INSIDE THE ENGINE PROCESS INSTEAD OF OVER SOCKETS
+# EACH PLAYER_PATH MUST THEN CONTAIN A PYTHON player.py DEFINING A Player CLASS
+HEADLESS = False
+# NUM_SHARDS > 1 SPLITS THE MATCH INTO BLOCKS OF ROUNDS PLAYED IN PARALLEL, EACH WITH FRESH POKERBOTS
+# SHARD LOGS REPORT BANKROLLS FROM THE START OF THEIR SHARD; THE FINAL LINE AND THE .json REPORT ARE MERGED
+NUM_SHARDS = 1
+# MATCH_SEED FIXES EVERY ROUND'S CARDS AND BOUNTIES; None MEANS UNSEEDED (SHARDS THEN PICK THEIR OWN SEEDS)
+MATCH_SEED = None
+# DECK_FILE PRE-DEALS EVERY ROUND: ONE LINE PER ROUND WITH 9 CARDS (SEAT 0 HAND, SEAT 1 HAND, BOARD)
+# AND OPTIONALLY 2 BOUNTY RANKS FOR ROUNDS THAT RESET THE BOUNTIES; None DISABLES IT
+DECK_FILE = None
+# DUPLICATE REPLAYS EVERY DEAL WITH FRESH POKERBOTS AND SEATS SWAPPED, THEN REPORTS THE PAIRED RESULT
+# WITHOUT MATCH_SEED OR DECK_FILE A DUPLICATE MATCH DRAWS ITS OWN SEED SO BOTH HALVES GET THE SAME DEALS
+DUPLICATE = False
+# EARLY_STOP ENDS THE MATCH ONCE A SEQUENTIAL TEST (MIXTURE SPRT, SEE early_stop.py) ON PLAYER_1'S DELTAS DECIDES IT:
+# ONE PLAYER AHEAD WITH EARLY_STOP_CONFIDENCE, OR THE MEAN DELTA PER ROUND PROVEN WITHIN EARLY_STOP_EPSILON OF 0
+# THE TEST NEVER STOPS BEFORE EARLY_STOP_MIN_ROUNDS; IT IS IGNORED WHEN NUM_SHARDS > 1
+EARLY_STOP = False
+EARLY_STOP_CONFIDENCE = 0.95
+EARLY_STOP_EPSILON = 2.0
+EARLY_STOP_MIN_ROUNDS = 100
 # THE GAME VARIANT FIXES THE PARAMETERS BELOW
 # CHANGE ONLY FOR TRAINING OR EXPERIMENTATION
 NUM_ROUNDS = 1000
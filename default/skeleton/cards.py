@@ -0,0 +1,138 @@
+'''
+Compact card representation for the player.
+
+A card is an int from 0 to 51, suit * 13 + rank, with ranks 2 to A as 0 to 12 and suits
+in the order c, d, h, s (the same order as eval7). A set of cards is a 52-bit int mask
+and a set of ranks a 13-bit int mask, so containment, dead-card and bounty checks are
+single bit operations.
+'''
+from collections import namedtuple
+
+try:
+    import eval7
+except ImportError:  # eval7 is optional; only to_eval7 needs it
+    eval7 = None
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+CARD_NAMES = [rank + suit for suit in SUITS for rank in RANKS]
+CARD_INDEX = {name: card for card, name in enumerate(CARD_NAMES)}
+CARD_BITS = [1 << card for card in range(52)]
+RANK_BITS = [1 << (card % 13) for card in range(52)]
+BOUNTY_BITS = {rank: 1 << index for index, rank in enumerate(RANKS)}  # '-1' or unknown ranks hit nothing
+FULL_DECK = (1 << 52) - 1
+EVAL7_CARDS = [eval7.Card(name) for name in CARD_NAMES] if eval7 is not None else None
+
+
+def rank(card):
+    return card % 13
+
+
+def suit(card):
+    return card // 13
+
+
+def parse_cards(text):
+    '''
+    Parses comma-separated card names like 'Ah,Kd' into a list of ints.
+    '''
+    return [CARD_INDEX[name] for name in text.split(',')] if text else []
+
+
+def card_names(cards):
+    '''
+    Returns the names of a list of ints.
+    '''
+    return [CARD_NAMES[card] for card in cards]
+
+
+def card_mask(cards):
+    '''
+    Returns the 52-bit mask of a list of ints.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= CARD_BITS[card]
+    return mask
+
+
+def rank_mask(cards):
+    '''
+    Returns the 13-bit mask of the ranks in a list of ints.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= RANK_BITS[card]
+    return mask
+
+
+def mask_cards(mask):
+    '''
+    Returns the ints in a 52-bit mask, in increasing order.
+    '''
+    cards = []
+    while mask:
+        low_bit = mask & -mask
+        cards.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return cards
+
+
+def to_eval7(cards):
+    '''
+    Returns the shared eval7.Card objects of a list of ints, without allocating new cards.
+    '''
+    return [EVAL7_CARDS[card] for card in cards]
+
+
+class CardState(namedtuple('_CardState', ['hands', 'board', 'hand_masks', 'board_mask', 'hand_ranks', 'board_ranks'])):
+    '''
+    The cards of one round as ints and masks: both hands (empty until revealed) and
+    the board dealt so far. Immutable, so every RoundState of the round can share it.
+    '''
+
+    @classmethod
+    def from_cards(cls, hands, board):
+        '''
+        Builds the card state from two lists of ints for the hands and one for the board.
+        '''
+        return cls(hands, board, [card_mask(hands[0]), card_mask(hands[1])], card_mask(board),
+                   [rank_mask(hands[0]), rank_mask(hands[1])], rank_mask(board))
+
+    @classmethod
+    def from_names(cls, hands, board):
+        '''
+        Builds the card state from card names, as in RoundState.hands and RoundState.deck.
+        '''
+        return cls.from_cards([[CARD_INDEX[name] for name in hand] for hand in hands],
+                              [CARD_INDEX[name] for name in board])
+
+    def with_board(self, board):
+        '''
+        Returns the card state with a new board, a list of ints.
+        '''
+        return self._replace(board=board, board_mask=card_mask(board), board_ranks=rank_mask(board))
+
+    def with_hand(self, seat, hand):
+        '''
+        Returns the card state with seat's hand revealed as hand, a list of ints.
+        '''
+        hands = list(self.hands)
+        hand_masks = list(self.hand_masks)
+        hand_ranks = list(self.hand_ranks)
+        hands[seat] = hand
+        hand_masks[seat] = card_mask(hand)
+        hand_ranks[seat] = rank_mask(hand)
+        return self._replace(hands=hands, hand_masks=hand_masks, hand_ranks=hand_ranks)
+
+    def dead_mask(self, seat):
+        '''
+        Returns the mask of the cards seat can see: its hand and the board.
+        '''
+        return self.hand_masks[seat] | self.board_mask
+
+    def bounty_hit(self, seat, bounty):
+        '''
+        Returns whether the bounty rank (like 'A', or '-1' for none) is in seat's hand or on the board.
+        '''
+        return (BOUNTY_BITS.get(bounty, 0) & (self.hand_ranks[seat] | self.board_ranks)) != 0
@@ -0,0 +1,91 @@
+'''
+Sequential test for stopping a match once its result is decided.
+
+The test is a normal-mixture sequential probability ratio test (mixture SPRT) on
+PLAYER_1's per-round deltas, with the per-round variance estimated as the match goes.
+Its confidence sequence for the mean delta per round is valid at every round at once,
+so the match can be checked after every round and stopped the first time either:
+
+- the sequence excludes 0, so one player is ahead with the configured confidence, or
+- the sequence lies within (-epsilon, epsilon), so the players are proven equal to
+  within epsilon chips per round.
+
+The variance is a plug-in estimate, so coverage is approximate for the first rounds;
+min_rounds keeps the test from deciding before the estimate settles.
+'''
+import math
+
+
+class SequentialTest():
+    '''
+    Tracks the mixture SPRT of the mean delta per round against zero.
+    '''
+
+    def __init__(self, confidence=0.95, epsilon=0., min_rounds=100):
+        self.alpha = 1. - confidence
+        self.epsilon = epsilon
+        self.min_rounds = min_rounds
+        self.rounds = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.decision = None
+
+    def update(self, delta):
+        '''
+        Adds one round's delta. Returns True once the match is decided.
+        '''
+        self.rounds += 1
+        difference = delta - self.mean
+        self.mean += difference / self.rounds
+        self.m2 += difference * (delta - self.mean)
+        if self.decision is None and self.rounds >= self.min_rounds:
+            low, high = self.bounds()
+            if low > 0. or high < 0.:
+                self.decision = 'ahead'
+            elif -self.epsilon < low and high < self.epsilon:
+                self.decision = 'equal'
+        return self.decision is not None
+
+    def intrinsic_time(self):
+        '''
+        Returns (V, rho): the estimated variance of the sum of deltas and the mixture
+        variance, tuned so the boundary is tightest around min_rounds.
+        '''
+        variance = max(self.m2 / (self.rounds - 1), 1e-9) if self.rounds > 1 else 1e-9
+        return self.rounds * variance, max(self.min_rounds, 1) * variance
+
+    def log_statistic(self):
+        '''
+        Returns the log of the mixture likelihood ratio against a zero mean; the match
+        has a leader once it exceeds log(1 / (1 - confidence)).
+        '''
+        if self.rounds == 0:
+            return 0.
+        v, rho = self.intrinsic_time()
+        total = self.mean * self.rounds
+        return 0.5 * math.log(rho / (v + rho)) + total * total / (2 * (v + rho))
+
+    def bounds(self):
+        '''
+        Returns the confidence sequence's bounds on the mean delta per round.
+        '''
+        if self.rounds == 0:
+            return -math.inf, math.inf
+        v, rho = self.intrinsic_time()
+        radius = math.sqrt((v + rho) * math.log((v + rho) / (rho * self.alpha ** 2))) / self.rounds
+        return self.mean - radius, self.mean + radius
+
+    def describe(self, name_1, name_2):
+        '''
+        Summarizes the decision for the game log, where name_1 is PLAYER_1.
+        '''
+        low, high = self.bounds()
+        confidence = '{:g}%'.format(100 * (1 - self.alpha))
+        if self.decision == 'ahead':
+            verdict = '{} ahead with {} confidence'.format(name_1 if self.mean > 0 else name_2, confidence)
+        elif self.decision == 'equal':
+            verdict = '{} and {} within {:g} per round of equal with {} confidence'.format(name_1, name_2, self.epsilon, confidence)
+        else:
+            verdict = 'undecided'
+        return '{} ({} {:+.2f} per round, confidence sequence [{:+.2f}, {:+.2f}], log mixture likelihood ratio {:.2f})'.format(
+            verdict, name_1, self.mean, low, high, self.log_statistic())
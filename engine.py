@@ -3,20 +3,30 @@
 DO NOT REMOVE, RENAME, OR EDIT THIS FILE
 '''
 from collections import namedtuple
-from threading import Thread
-from queue import Queue
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout, redirect_stderr
+from threading import Condition, Lock, Thread
 import time
 import math
 import json
 import subprocess
 import socket
+import tempfile
+import importlib
+import traceback
 import eval7
 import sys
 import os
 import random
+import statistics
+import gzip
+import lzma
 
 sys.path.append(os.getcwd())
 from config import *
+from hand_history import HandHistoryWriter, NO_RANK, card_index
+from latency import LatencyRecorder
+from early_stop import SequentialTest
 
 FoldAction = namedtuple('FoldAction', [])
 CallAction = namedtuple('CallAction', [])
@@ -26,12 +36,20 @@ RaiseAction = namedtuple('RaiseAction', ['amount'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'bounty_hits', 'previous_state'])
 
 STREET_NAMES = ['Flop', 'Turn', 'River']
+CARD_NAMES = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
 DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction}
+ENCODE = {'FoldAction': 'F', 'CallAction': 'C', 'CheckAction': 'K'}
 CCARDS = lambda cards: ','.join(map(str, cards))
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 
+# game log verbosity levels: the final result, one summary per round, every action
+LOG_FINAL, LOG_RESULTS, LOG_ACTIONS = 0, 1, 2
+LOG_OPENERS = {None: ('', open), 'gzip': ('.gz', gzip.open), 'lzma': ('.xz', lzma.open)}
+GAME_LOG_CHUNK_LINES = 4096
+GAME_LOG_FLUSH_INTERVAL = 1.0
+
 # Socket encoding scheme:
 #
 # T#.### the player's game clock
@@ -239,12 +257,279 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self.bounties, self)
 
 
+class MutableRoundState():
+    '''
+    Encodes one round of poker as a single state that is updated in place.
+
+    Follows exactly the rules of RoundState, but proceed mutates this object instead of
+    allocating a new state per action. The states a RoundState chain would link through
+    previous_state are kept as snapshot tuples in an undo log, and bounty hits are
+    precomputed as rank bit masks when the round is dealt.
+    '''
+    __slots__ = ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'bounties', 'board',
+                 'hole_ranks', 'board_ranks', 'bounty_bits', 'history']
+
+    def __init__(self, hands, deck, bounties):
+        self.button = 0
+        self.street = 0
+        self.pips = [SMALL_BLIND, BIG_BLIND]
+        self.stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.hands = hands
+        self.deck = deck
+        self.bounties = bounties
+        self.board = deck.peek(5)
+        self.hole_ranks = [(1 << hand[0].rank) | (1 << hand[1].rank) for hand in hands]
+        # ranks on the board by each street, indexed by street
+        self.board_ranks = [0] * 6
+        for street in (3, 4, 5):
+            for card in self.board[:street]:
+                self.board_ranks[street] |= 1 << card.rank
+        self.bounty_bits = [1 << CARD_NAMES.index(bounty) if bounty in CARD_NAMES else 0 for bounty in bounties]
+        self.history = []
+
+    def snapshot(self):
+        '''
+        Returns the (button, street, pip0, pip1, stack0, stack1) tuple kept in the undo log.
+        '''
+        return (self.button, self.street, self.pips[0], self.pips[1], self.stacks[0], self.stacks[1])
+
+    def undo(self):
+        '''
+        Restores the state before the most recent transition.
+        '''
+        self.button, self.street, self.pips[0], self.pips[1], self.stacks[0], self.stacks[1] = self.history.pop()
+        return self
+
+    def get_bounty_hits(self):
+        '''
+        Determines if each player hit their bounty card during the round.
+        '''
+        board_ranks = self.board_ranks[self.street]
+        return (self.bounty_bits[0] & (self.hole_ranks[0] | board_ranks) != 0,
+                self.bounty_bits[1] & (self.hole_ranks[1] | board_ranks) != 0)
+
+    get_delta = RoundState.get_delta
+    legal_actions = RoundState.legal_actions
+    raise_bounds = RoundState.raise_bounds
+
+    def showdown(self):
+        '''
+        Compares the players' hands and computes the final payoffs at showdown.
+        '''
+        score0 = eval7.evaluate(self.board + self.hands[0])
+        score1 = eval7.evaluate(self.board + self.hands[1])
+        assert(self.stacks[0] == self.stacks[1])
+        delta = self.get_delta(0 if score0 > score1 else 1 if score0 < score1 else 2)
+        return TerminalState([delta, -delta], self.get_bounty_hits(), self)
+
+    def proceed_street(self):
+        '''
+        Resets the players' pips and advances to the next round of betting.
+        '''
+        if self.street == 5:
+            return self.showdown()
+        self.history.append(self.snapshot())
+        self.button = 1
+        self.street = 3 if self.street == 0 else self.street + 1
+        self.pips[0] = self.pips[1] = 0
+        return self
+
+    def proceed(self, action):
+        '''
+        Advances the round by one action performed by the active player.
+
+        Returns this state, updated in place, or a TerminalState if the round is over.
+        '''
+        active = self.button % 2
+        if isinstance(action, FoldAction):
+            delta = self.get_delta(1 - active)  # if active folds, the other player wins
+            return TerminalState([delta, -delta], self.get_bounty_hits(), self)
+        if isinstance(action, CheckAction) and ((self.street == 0 and self.button > 0) or self.button > 1):
+            return self.proceed_street()  # both players acted
+        self.history.append(self.snapshot())
+        if isinstance(action, CallAction):
+            if self.button == 0:  # sb calls bb
+                self.button = 1
+                self.pips[0] = self.pips[1] = BIG_BLIND
+                self.stacks[0] = self.stacks[1] = STARTING_STACK - BIG_BLIND
+                return self
+            # both players acted
+            contribution = self.pips[1-active] - self.pips[active]
+            self.stacks[active] -= contribution
+            self.pips[active] += contribution
+            self.button += 1
+            return self.proceed_street()
+        if isinstance(action, CheckAction):
+            # let opponent act
+            self.button += 1
+            return self
+        # isinstance(action, RaiseAction)
+        contribution = action.amount - self.pips[active]
+        self.stacks[active] -= contribution
+        self.pips[active] += contribution
+        self.button += 1
+        return self
+
+
+class GameLog():
+    '''
+    Streams the game log to disk from a background writer thread.
+
+    Lines are buffered and handed to the writer in chunks, so a long match never holds
+    the whole log in memory and a crash loses at most the last unflushed chunk.
+    Uncompressed output is byte-for-byte the newline-joined lines. Lines above the
+    configured verbosity are dropped. Without background, full chunks are written by
+    append itself, for hosts that run many games and want no thread per log.
+    '''
+
+    def __init__(self, filename, compression=None, verbosity=LOG_ACTIONS, background=True):
+        extension, self.opener = LOG_OPENERS[compression]
+        self.filename = filename + '.txt' + extension
+        self.verbosity = verbosity
+        self.log_file = self.opener(self.filename, 'wt')
+        self.lines = []
+        self.separator = ''
+        self.closed = False
+        self.condition = Condition(Lock())
+        self.writer = None
+        if background:
+            self.writer = Thread(target=self.write_chunks, daemon=True)
+            self.writer.start()
+
+    def append(self, line, level=LOG_RESULTS):
+        '''
+        Adds one line to the log if level is within the configured verbosity.
+        '''
+        if level <= self.verbosity:
+            with self.condition:
+                self.lines.append(line)
+                if len(self.lines) >= GAME_LOG_CHUNK_LINES:
+                    if self.writer is None:
+                        self.write_lines(self.lines)
+                        self.lines = []
+                    else:
+                        self.condition.notify()
+
+    def copy_from(self, filename):
+        '''
+        Appends every line of another game log, then deletes it.
+        '''
+        with self.opener(filename, 'rt') as log_file:
+            for line in log_file:
+                self.append(line.rstrip('\n'), LOG_FINAL)
+        os.remove(filename)
+
+    def write_lines(self, lines):
+        '''
+        Writes one chunk of lines to the file.
+        '''
+        if lines:
+            self.log_file.write(self.separator + '\n'.join(lines))
+            self.separator = '\n'
+            self.log_file.flush()  # lzma output only becomes readable on close
+
+    def write_chunks(self):
+        '''
+        Writes buffered lines whenever a chunk fills up, the flush interval passes or the log closes.
+        '''
+        closed = False
+        while not closed:
+            with self.condition:
+                if not self.closed and len(self.lines) < GAME_LOG_CHUNK_LINES:
+                    self.condition.wait(GAME_LOG_FLUSH_INTERVAL)
+                lines, self.lines = self.lines, []
+                closed = self.closed
+            self.write_lines(lines)
+        self.log_file.close()
+
+    def close(self):
+        '''
+        Flushes the remaining lines and closes the file.
+        '''
+        if self.writer is None:
+            with self.condition:
+                self.closed = True
+                self.write_lines(self.lines)
+                self.lines = []
+            self.log_file.close()
+            return
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.writer.join()
+
+
+class PlayerLog():
+    '''
+    Bounded capture of one pokerbot's output, kept to at most limit bytes.
+
+    With 'head' retention the first limit bytes stream straight to the log file while
+    the match runs and later output is dropped. With 'tail' retention a ring buffer
+    keeps the latest limit bytes, which are written out when the log closes.
+    '''
+
+    def __init__(self, filename, limit, retention='head'):
+        self.filename = filename
+        self.limit = limit
+        self.retention = retention
+        self.log_file = None
+        self.ring = bytearray(limit) if retention == 'tail' else None
+        self.position = 0
+        self.bytes_written = 0
+        self.lock = Lock()
+
+    @property
+    def full(self):
+        '''
+        True once head retention has written limit bytes and drops everything else.
+        '''
+        return self.ring is None and self.bytes_written >= self.limit
+
+    def put(self, output):
+        '''
+        Records one chunk of output; anything but bytes (e.g. None from a dead pipe) is ignored.
+        '''
+        if not isinstance(output, bytes) or self.limit <= 0:
+            return
+        with self.lock:
+            if self.ring is None:
+                if self.bytes_written < self.limit:
+                    if self.log_file is None:
+                        self.log_file = open(self.filename, 'wb')
+                    output = output[:self.limit - self.bytes_written]
+                    self.bytes_written += self.log_file.write(output)
+                return
+            output = output[-self.limit:]
+            end = self.position + len(output)
+            if end <= self.limit:
+                self.ring[self.position:end] = output
+            else:
+                split = self.limit - self.position
+                self.ring[self.position:] = output[:split]
+                self.ring[:end - self.limit] = output[split:]
+            self.position = end % self.limit
+            self.bytes_written += len(output)
+
+    def close(self):
+        '''
+        Writes out any retained tail and closes the log file.
+        '''
+        with self.lock:
+            if self.log_file is None:
+                self.log_file = open(self.filename, 'wb')
+            if self.ring is not None:
+                if self.bytes_written >= self.limit:  # wrapped, so the oldest byte sits at position
+                    self.log_file.write(self.ring[self.position:])
+                self.log_file.write(self.ring[:self.position])
+            self.log_file.close()
+
+
 class Player():
     '''
     Handles subprocess and socket interactions with one player's pokerbot.
     '''
 
-    def __init__(self, name, path):
+    def __init__(self, name, path, log_filename=None):
         self.name = name
         self.path = path
         self.game_clock = STARTING_GAME_CLOCK
@@ -252,7 +537,13 @@ class Player():
         self.commands = None
         self.bot_subprocess = None
         self.socketfile = None
-        self.bytes_queue = Queue()
+        self.player_log = PlayerLog(log_filename or name + '.txt', PLAYER_LOG_SIZE_LIMIT, PLAYER_LOG_RETENTION)
+        self.query_time = 0.
+        self.startup_time = None
+        self.output_thread = None
+        self.pipelined = False
+        self.pending = []
+        self.warm = False
 
     def build(self):
         '''
@@ -276,61 +567,120 @@ class Player():
                 proc = subprocess.run(self.commands['build'],
                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                                       cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
-                self.bytes_queue.put(proc.stdout)
+                self.player_log.put(proc.stdout)
             except subprocess.TimeoutExpired as timeout_expired:
                 error_message = 'Timed out waiting for ' + self.name + ' to build'
                 print(error_message)
-                self.bytes_queue.put(timeout_expired.stdout)
-                self.bytes_queue.put(error_message.encode())
+                self.player_log.put(timeout_expired.stdout)
+                self.player_log.put(error_message.encode())
             except (TypeError, ValueError):
                 print(self.name, 'build command misformatted')
             except OSError:
                 print(self.name, 'build failed - check "build" in commands.json')
 
+    def relay_output(self, out):
+        '''
+        Starts a thread that copies the pokerbot's output to its player log.
+        '''
+        # function for bot listening
+        def enqueue_output(out, player_log):
+            try:
+                for line in out:
+                    if self.path == r"./player_chatbot":
+                        print(line.strip().decode("utf-8"))
+                    else:
+                        player_log.put(line)
+            except ValueError:
+                pass
+        # start a separate bot listening thread which dies with the program
+        self.output_thread = Thread(target=enqueue_output, args=(out, self.player_log), daemon=True)
+        self.output_thread.start()
+
+    def start_bot(self, args, pass_fds=()):
+        '''
+        Starts the pokerbot subprocess with the transport arguments and relays its output.
+        '''
+        proc = subprocess.Popen(self.commands['run'] + args,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                cwd=self.path, pass_fds=pass_fds)
+        self.bot_subprocess = proc
+        self.relay_output(proc.stdout)
+
     def run(self):
         '''
         Runs the pokerbot and establishes the socket connection.
+
+        TRANSPORT picks a TCP port (with Nagle disabled), a Unix domain socket in a
+        private directory or an inherited socketpair. Where Unix sockets are not
+        available the engine falls back to TCP. A warm player's pokerbot is instead
+        forked from a warm process that its pool started earlier.
         '''
         if self.commands is not None and len(self.commands['run']) > 0:
+            transport = TRANSPORT if TRANSPORT in ('unix', 'socketpair') and os.name == 'posix' else 'tcp'
+            socket_dir = None
+            start_time = time.perf_counter()
             try:
-                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                with server_socket:
-                    server_socket.bind(('', 0))
-                    server_socket.settimeout(CONNECT_TIMEOUT)
-                    server_socket.listen()
-                    port = server_socket.getsockname()[1]
-                    proc = subprocess.Popen(self.commands['run'] + [str(port)],
-                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                            cwd=self.path)
-                    self.bot_subprocess = proc
-                    # function for bot listening
-                    def enqueue_output(out, queue):
-                        try:
-                            for line in out:
-                                if self.path == r"./player_chatbot":
-                                    print(line.strip().decode("utf-8"))
-                                else:
-                                    queue.put(line)
-                        except ValueError:
-                            pass
-                    # start a separate bot listening thread which dies with the program
-                    Thread(target=enqueue_output, args=(proc.stdout, self.bytes_queue), daemon=True).start()
-                    # block until we timeout or the player connects
-                    client_socket, _ = server_socket.accept()
-                    with client_socket:
-                        if self.path == r"./player_chatbot":
-                            client_socket.settimeout(PLAYER_TIMEOUT)
+                warm_bot = get_warm_bot(self.name, self.path, self.commands) if self.warm else None
+                if warm_bot is not None:
+                    client_socket, output = warm_bot.fork()
+                    self.relay_output(output)
+                elif transport == 'socketpair':
+                    client_socket, bot_socket = socket.socketpair()
+                    with bot_socket:
+                        self.start_bot(['--fd', str(bot_socket.fileno())], pass_fds=(bot_socket.fileno(),))
+                else:
+                    if transport == 'unix':
+                        socket_dir = tempfile.mkdtemp(prefix='pokerbots-')
+                        server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    else:
+                        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    with server_socket:
+                        if transport == 'unix':
+                            address = os.path.join(socket_dir, 'bot.sock')
+                            server_socket.bind(address)
+                            args = ['--unix', address]
                         else:
-                            client_socket.settimeout(CONNECT_TIMEOUT)
-                        sock = client_socket.makefile('rw')
-                        self.socketfile = sock
-                        print(self.name, 'connected successfully')
+                            server_socket.bind(('', 0))
+                            args = [str(server_socket.getsockname()[1])]
+                        server_socket.settimeout(CONNECT_TIMEOUT)
+                        server_socket.listen()
+                        self.start_bot(args)
+                        # block until we timeout or the player connects
+                        client_socket, _ = server_socket.accept()
+                with client_socket:
+                    if warm_bot is None and transport == 'tcp':
+                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    if self.path == r"./player_chatbot":
+                        client_socket.settimeout(PLAYER_TIMEOUT)
+                    else:
+                        client_socket.settimeout(CONNECT_TIMEOUT)
+                    sock = client_socket.makefile('rw')
+                    self.socketfile = sock
+                    if PIPELINE_ROUNDS:
+                        self.negotiate()
+                    self.startup_time = time.perf_counter() - start_time
+                    print(self.name, 'connected successfully in {:.3f}s'.format(self.startup_time))
             except (TypeError, ValueError):
                 print(self.name, 'run command misformatted')
             except OSError:
                 print(self.name, 'run failed - check "run" in commands.json')
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to connect')
+            finally:
+                if socket_dir is not None:
+                    for filename in os.listdir(socket_dir):
+                        os.remove(os.path.join(socket_dir, filename))
+                    os.rmdir(socket_dir)
+
+    def negotiate(self):
+        '''
+        Offers the pipelined protocol, where round-over clauses are sent with the next
+        deal instead of being acked. Runners that support it answer V1; older ones
+        ignore the offer and ack it with K.
+        '''
+        self.socketfile.write('V1\n')
+        self.socketfile.flush()
+        self.pipelined = self.socketfile.readline().strip() == 'V1'
 
     def stop(self):
         '''
@@ -338,7 +688,7 @@ class Player():
         '''
         if self.socketfile is not None:
             try:
-                self.socketfile.write('Q\n')
+                self.socketfile.write(' '.join(self.pending + ['Q']) + '\n')
                 self.socketfile.close()
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to disconnect')
@@ -350,21 +700,17 @@ class Player():
                     outs, _ = self.bot_subprocess.communicate(timeout=PLAYER_TIMEOUT)
                 else:
                     outs, _ = self.bot_subprocess.communicate(timeout=CONNECT_TIMEOUT)
-                self.bytes_queue.put(outs)
+                self.player_log.put(outs)
             except subprocess.TimeoutExpired:
                 print('Timed out waiting for', self.name, 'to quit')
                 self.bot_subprocess.kill()
                 outs, _ = self.bot_subprocess.communicate()
-                self.bytes_queue.put(outs)
-        with open(self.name + '.txt', 'wb') as log_file:
-            bytes_written = 0
-            for output in self.bytes_queue.queue:
-                try:
-                    bytes_written += log_file.write(output)
-                    if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                        break
-                except TypeError:
-                    pass
+                self.player_log.put(outs)
+        elif self.output_thread is not None:  # a forked pokerbot closes its output when it quits
+            self.output_thread.join(PLAYER_TIMEOUT if self.path == r"./player_chatbot" else CONNECT_TIMEOUT)
+            if self.output_thread.is_alive():
+                print('Timed out waiting for', self.name, 'to quit')
+        self.player_log.close()
 
     def query(self, round_state, player_message, game_log):
         '''
@@ -375,10 +721,10 @@ class Player():
         validates that the received action is legal.
 
         Args:
-            round_state (RoundState or TerminalState): The current state of the game.
+            round_state (MutableRoundState or TerminalState): The current state of the game.
             player_message (list): Messages to be sent to the player bot, including game state
                 information like time remaining, player position, and cards.
-            game_log (list): A list to store game events and error messages.
+            game_log (GameLog): The game log that receives error messages.
 
         Returns:
             Action: One of FoldAction, CallAction, CheckAction, or RaiseAction representing
@@ -392,7 +738,8 @@ class Player():
             - Bot disconnections or timeouts result in game clock being set to 0
             - At the end of a round, only CheckAction is considered legal
         '''
-        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
+        legal_actions = {CheckAction} if isinstance(round_state, TerminalState) else round_state.legal_actions()
+        self.query_time = 0.
         if self.socketfile is not None and self.game_clock > 0.:
             clause = ''
             try:
@@ -404,20 +751,14 @@ class Player():
                 self.socketfile.flush()
                 clause = self.socketfile.readline().strip()
                 end_time = time.perf_counter()
+                self.query_time = end_time - start_time
                 if ENFORCE_GAME_CLOCK and self.path != r"./player_chatbot":
                     self.game_clock -= end_time - start_time
                 if self.game_clock <= 0.:
                     raise socket.timeout
-                action = DECODE[clause[0]]
-                if action in legal_actions:
-                    if clause[0] == 'R':
-                        amount = int(clause[1:])
-                        min_raise, max_raise = round_state.raise_bounds()
-                        if min_raise <= amount <= max_raise:
-                            return action(amount)
-                    else:
-                        return action()
-                game_log.append(self.name + ' attempted illegal ' + action.__name__)
+                action = self.decode_action(clause, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
             except socket.timeout:
                 error_message = self.name + ' ran out of time'
                 game_log.append(error_message)
@@ -432,33 +773,465 @@ class Player():
                 game_log.append(self.name + ' response misformatted: ' + str(clause))
         return CheckAction() if CheckAction in legal_actions else FoldAction()
 
+    def decode_action(self, clause, round_state, legal_actions, game_log):
+        '''
+        Decodes one response clause from the pokerbot.
+
+        Returns the action if it is legal, otherwise logs the attempt and returns None.
+        Misformatted clauses raise IndexError, KeyError or ValueError.
+        '''
+        action = DECODE[clause[0]]
+        if action in legal_actions:
+            if clause[0] == 'R':
+                amount = int(clause[1:])
+                min_raise, max_raise = round_state.raise_bounds()
+                if min_raise <= amount <= max_raise:
+                    return action(amount)
+            else:
+                return action()
+        game_log.append(self.name + ' attempted illegal ' + action.__name__)
+        return None
+
+
+class WarmBot():
+    '''
+    A pokerbot process started once and forked for every match that needs it.
+
+    The process is started with --fork-server and a control socket, constructs its
+    Player and reports ready. For each match the engine passes it a connected game
+    socket and an output pipe, and it forks a fresh copy of the pokerbot to play on them.
+    '''
+
+    def __init__(self, name, path, commands):
+        self.name = name
+        start_time = time.perf_counter()
+        self.control, bot_control = socket.socketpair()
+        with bot_control:
+            self.bot_subprocess = subprocess.Popen(commands['run'] + ['--fork-server', '--fd', str(bot_control.fileno())],
+                                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                   cwd=path, pass_fds=(bot_control.fileno(),))
+        self.player_log = PlayerLog(name + '.pool.txt', PLAYER_LOG_SIZE_LIMIT, PLAYER_LOG_RETENTION)
+        Thread(target=self.relay_output, daemon=True).start()
+        self.control.settimeout(CONNECT_TIMEOUT)
+        self.controlfile = self.control.makefile('rb')
+        if self.controlfile.readline() != b'R\n':
+            self.close()
+            raise OSError(name + ' did not start a fork server')
+        self.startup_time = time.perf_counter() - start_time
+        self.lock = Lock()
+
+    def relay_output(self):
+        '''
+        Copies the fork server's own output to its log.
+        '''
+        try:
+            for line in self.bot_subprocess.stdout:
+                self.player_log.put(line)
+        except ValueError:
+            pass
+
+    def fork(self):
+        '''
+        Forks the pokerbot for one match. Returns the engine's end of the game socket and
+        the read end of the forked pokerbot's output.
+        '''
+        game_socket, bot_socket = socket.socketpair()
+        read_fd, write_fd = os.pipe()
+        try:
+            with self.lock:
+                socket.send_fds(self.control, [b'N'], [bot_socket.fileno(), write_fd])
+                if not self.controlfile.readline().startswith(b'F'):
+                    raise OSError(self.name + ' fork server failed')
+        except OSError:
+            game_socket.close()
+            os.close(read_fd)
+            raise
+        finally:
+            bot_socket.close()
+            os.close(write_fd)
+        return game_socket, os.fdopen(read_fd, 'rb')
+
+    def close(self):
+        '''
+        Stops the fork server. Forked pokerbots still playing are unaffected.
+        '''
+        self.controlfile.close()
+        self.control.close()
+        try:
+            self.bot_subprocess.communicate(timeout=CONNECT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.bot_subprocess.kill()
+            self.bot_subprocess.communicate()
+        self.player_log.close()
+
+
+warm_bots = {}
+
+
+def get_warm_bot(name, path, commands):
+    '''
+    Returns the warm pool's fork server for a pokerbot path, starting it on first use.
+
+    Returns None where fork servers are unavailable or the pokerbot cannot run one,
+    so the caller starts the pokerbot normally.
+    '''
+    if not hasattr(os, 'fork') or not hasattr(socket, 'send_fds'):
+        return None
+    if path not in warm_bots:
+        try:
+            warm_bots[path] = WarmBot(name, path, commands)
+            print(name, 'warm pool started in {:.3f}s'.format(warm_bots[path].startup_time))
+        except (OSError, socket.timeout):
+            print(name, 'could not start a warm pool - starting it per match')
+            warm_bots[path] = None
+    return warm_bots[path]
+
+
+def close_warm_bots():
+    '''
+    Stops every fork server of the warm pool.
+    '''
+    for warm_bot in warm_bots.values():
+        if warm_bot is not None:
+            warm_bot.close()
+    warm_bots.clear()
+
+
+class BotOutput():
+    '''
+    File-like sink for the stdout and stderr of an in-process pokerbot.
+    '''
+
+    def __init__(self, player_log):
+        self.player_log = player_log
+
+    def write(self, text):
+        if not self.player_log.full:
+            self.player_log.put(text.encode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def import_pokerbot(path):
+    '''
+    Imports player.py from path together with that pokerbot's own skeleton package.
+
+    Every pokerbot ships a package named skeleton, so the imported modules are evicted
+    from sys.modules afterwards and the next pokerbot gets its own copy.
+    '''
+    def evict():
+        for module_name in list(sys.modules):
+            if module_name in ('player', 'skeleton') or module_name.startswith('skeleton.'):
+                del sys.modules[module_name]
+    path = os.path.abspath(path)
+    cwd = os.getcwd()
+    evict()
+    sys.path.insert(0, path)
+    os.chdir(path)
+    try:
+        player_module = importlib.import_module('player')
+        states_module = importlib.import_module('skeleton.states')
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(path)
+        evict()
+    return player_module, states_module
+
+
+class InProcessPlayer(Player):
+    '''
+    Runs a Python pokerbot inside the engine process, without a subprocess or socket.
+
+    The pokerbot's callbacks are invoked directly and engine states are translated into
+    the pokerbot's own skeleton states, so it sees exactly what its Runner would build.
+    '''
+
+    def __init__(self, name, path, log_filename=None):
+        super().__init__(name, path, log_filename)
+        self.player_module = None
+        self.states_module = None
+        self.pokerbot = None
+        self.output = BotOutput(self.player_log)
+        self.active = 0
+        self.round_num = 1
+        self.round_flag = True
+        self.views = []
+        self.hand_view = None
+        self.bounty_view = None
+        self.board_views = None
+        self.card_views = None
+
+    def build(self):
+        '''
+        Imports the pokerbot's Player class and skeleton states.
+        '''
+        try:
+            with redirect_stdout(self.output), redirect_stderr(self.output):
+                self.player_module, self.states_module = import_pokerbot(self.path)
+        except FileNotFoundError:
+            print(self.name, 'player.py not found - check PLAYER_PATH')
+        except Exception:
+            traceback.print_exc(file=self.output)
+            print(self.name, 'import failed - check player.py')
+
+    def run(self):
+        '''
+        Instantiates the pokerbot in the engine process.
+        '''
+        if self.player_module is not None:
+            cwd = os.getcwd()
+            try:
+                os.chdir(self.path)
+                with redirect_stdout(self.output), redirect_stderr(self.output):
+                    self.pokerbot = self.player_module.Player()
+                print(self.name, 'loaded successfully')
+            except Exception:
+                traceback.print_exc(file=self.output)
+                print(self.name, 'failed to start - check Player.__init__')
+            finally:
+                os.chdir(cwd)
+
+    def start_views(self, round_state):
+        '''
+        Precomputes the pokerbot's view of the hands, bounties and boards of a new round.
+        '''
+        del self.views[:]
+        self.hand_view = [[], []]
+        self.hand_view[self.active] = [str(card) for card in round_state.hands[self.active]]
+        self.bounty_view = ['-1', '-1']
+        self.bounty_view[self.active] = round_state.bounties[self.active]
+        board = [str(card) for card in round_state.board]
+        self.board_views = {street: board[:street] for street in (0, 3, 4, 5)}
+        CardState = getattr(self.states_module, 'CardState', None)  # skeletons before cards.py have none
+        if CardState is not None:
+            hand_cards = [[], []]
+            hand_cards[self.active] = [card_index(card) for card in round_state.hands[self.active]]
+            board_cards = [card_index(card) for card in round_state.board]
+            self.card_views = {street: CardState.from_cards(hand_cards, board_cards[:street]) for street in (0, 3, 4, 5)}
+
+    def snapshot_view(self, snapshot, previous_state):
+        '''
+        Builds the pokerbot's skeleton RoundState for one undo log snapshot.
+        '''
+        button, street, pip0, pip1, stack0, stack1 = snapshot
+        cards = () if self.card_views is None else (self.card_views[street],)
+        return self.states_module.RoundState(button, street, [pip0, pip1], [stack0, stack1], list(self.hand_view),
+                                             list(self.bounty_view), self.board_views[street], previous_state, *cards)
+
+    def view(self, round_state):
+        '''
+        Translates the engine's round state into the pokerbot's skeleton RoundState.
+
+        Earlier states are rebuilt from the undo log into the previous_state chain, each
+        one only once per round.
+        '''
+        for snapshot in round_state.history[len(self.views):]:
+            self.views.append(self.snapshot_view(snapshot, self.views[-1] if self.views else None))
+        return self.snapshot_view(round_state.snapshot(), self.views[-1] if self.views else None)
+
+    def terminal_view(self, terminal_state):
+        '''
+        Translates an engine TerminalState into the pokerbot's skeleton TerminalState.
+        '''
+        previous_state = self.view(terminal_state.previous_state)
+        if FoldAction not in terminal_state.previous_state.legal_actions():  # showdown reveals the opponent
+            revised_hands = list(previous_state.hands)
+            opponent_hand = terminal_state.previous_state.hands[1-self.active]
+            revised_hands[1-self.active] = [str(card) for card in opponent_hand]
+            previous_state = previous_state._replace(hands=revised_hands)
+            if self.card_views is not None:
+                revised_cards = previous_state.cards.with_hand(1-self.active, [card_index(card) for card in opponent_hand])
+                previous_state = previous_state._replace(cards=revised_cards)
+        deltas = list(terminal_state.deltas)  # in seat order, as the Runner builds them
+        # only the winning player's bounty hit is revealed; like deltas, in seat order
+        bounty_hits = list(terminal_state.bounty_hits)
+        if terminal_state.deltas[0] > 0:
+            bounty_hits[1] = False
+        elif terminal_state.deltas[1] > 0:
+            bounty_hits[0] = False
+        return self.states_module.TerminalState(deltas, bounty_hits, previous_state)
+
+    def respond(self, round_state):
+        '''
+        Invokes the pokerbot's callbacks for one query and returns its encoded response.
+        '''
+        GameState = self.states_module.GameState
+        game_clock = float('{:.3f}'.format(self.game_clock))
+        if self.round_flag:
+            state = round_state.previous_state if isinstance(round_state, TerminalState) else round_state
+            self.start_views(state)
+            initial_state = self.snapshot_view(state.history[0] if state.history else state.snapshot(), None)
+            game_state = GameState(self.bankroll, game_clock, self.round_num)
+            self.pokerbot.handle_new_round(game_state, initial_state, self.active)
+            self.round_flag = False
+        if isinstance(round_state, TerminalState):
+            game_state = GameState(self.bankroll + round_state.deltas[self.active], game_clock, self.round_num)
+            self.pokerbot.handle_round_over(game_state, self.terminal_view(round_state), self.active)
+            self.round_num += 1
+            self.round_flag = True
+            return 'K'
+        game_state = GameState(self.bankroll, game_clock, self.round_num)
+        action = self.pokerbot.get_action(game_state, self.view(round_state), self.active)
+        code = ENCODE.get(type(action).__name__)
+        return code if code is not None else 'R' + str(action.amount)
+
+    def query(self, round_state, player_message, game_log):
+        '''
+        Requests one action from the in-process pokerbot.
+
+        Game clock accounting and action validation follow Player.query. The pokerbot's
+        seat is read from the P clause of the first message of each round.
+        '''
+        legal_actions = {CheckAction} if isinstance(round_state, TerminalState) else round_state.legal_actions()
+        self.query_time = 0.
+        if self.pokerbot is not None and self.game_clock > 0.:
+            if self.round_flag:
+                self.active = int(player_message[1][1:])
+            del player_message[1:]
+            clause = ''
+            try:
+                with redirect_stdout(self.output), redirect_stderr(self.output):
+                    start_time = time.perf_counter()
+                    clause = self.respond(round_state)
+                    end_time = time.perf_counter()
+                self.query_time = end_time - start_time
+                if ENFORCE_GAME_CLOCK and self.path != r"./player_chatbot":
+                    self.game_clock -= end_time - start_time
+                if self.game_clock <= 0.:
+                    raise socket.timeout
+                action = self.decode_action(clause, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
+            except socket.timeout:
+                error_message = self.name + ' ran out of time'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+            except (IndexError, KeyError, ValueError):
+                game_log.append(self.name + ' response misformatted: ' + str(clause))
+            except Exception:
+                # a crashed Runner would drop the socket, so treat it as a disconnect
+                traceback.print_exc(file=self.output)
+                error_message = self.name + ' disconnected'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+def read_deck_file(filename):
+    '''
+    Parses a pre-dealt deck file into a (cards, bounties) pair per round.
+
+    Each line holds seat 0's hand, seat 1's hand and the five board cards, optionally
+    followed by the two bounty ranks to use if that round resets the bounties.
+    Blank lines and text after '#' are ignored.
+    '''
+    rounds = []
+    with open(filename, 'r') as deck_file:
+        for line_num, line in enumerate(deck_file, 1):
+            tokens = line.split('#')[0].split()
+            if not tokens:
+                continue
+            if (len(tokens) not in (9, 11) or len(set(tokens[:9])) != 9 or
+                    any(rank not in CARD_NAMES for rank in tokens[9:])):
+                raise ValueError('{} line {} must list 9 distinct cards and optionally 2 bounty ranks'.format(filename, line_num))
+            rounds.append(([eval7.Card(token) for token in tokens[:9]], tokens[9:] or None))
+    return rounds
+
+
+class DealStream():
+    '''
+    Deals the deck of every round and the bounties of every bounty reset.
+
+    A seeded stream derives each deal from the seed and the round number alone, so
+    shards and the mirrored half of a duplicate match replay exactly the same deals.
+    A deck file fixes the cards (and optionally the bounties) of every round instead.
+    Without either, deals come from the global random module as before.
+    '''
+
+    def __init__(self, seed=None, deck_file=None):
+        self.seed = seed
+        self.rounds = None
+        if deck_file is not None:
+            self.rounds = read_deck_file(deck_file)
+            if len(self.rounds) < NUM_ROUNDS:
+                raise ValueError('{} deals {} rounds but NUM_ROUNDS is {}'.format(deck_file, len(self.rounds), NUM_ROUNDS))
+
+    def rng(self, stream, round_num):
+        '''
+        Returns the random number generator for one round of one stream.
+        '''
+        if self.seed is None:
+            return random
+        return random.Random('{}:{}:{}'.format(self.seed, stream, round_num))
+
+    def deck(self, round_num):
+        '''
+        Returns the shuffled deck for a round: two hands, then the board.
+        '''
+        deck = eval7.Deck()
+        if self.rounds is not None:
+            cards = self.rounds[round_num - 1][0]
+            deck.cards = cards + [card for card in deck.cards if card not in cards]
+        else:
+            self.rng('deck', round_num).shuffle(deck.cards)
+        return deck
+
+    def bounties(self, round_num):
+        '''
+        Returns the bounty ranks for seats 0 and 1 of a round that resets the bounties.
+        '''
+        if self.rounds is not None and self.rounds[round_num - 1][1] is not None:
+            return list(self.rounds[round_num - 1][1])
+        rng = self.rng('bounty', round_num)
+        return [CARD_NAMES[rng.randint(0, 12)], CARD_NAMES[rng.randint(0, 12)]]
+
 
 class Game():
     '''
     Manages logging and the high-level game procedure.
     '''
 
-    def __init__(self):
-        self.log = ['6.9630 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME]
+    def __init__(self, log_filename=GAME_LOG_FILENAME, title='6.9630 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME,
+                 background_log=True):
+        self.log = GameLog(log_filename, GAME_LOG_COMPRESSION, GAME_LOG_VERBOSITY, background_log)
+        self.log.append(title, LOG_FINAL)
+        # call sites check these before building lines, so disabled levels cost nothing
+        self.log_results = GAME_LOG_VERBOSITY >= LOG_RESULTS
+        self.log_actions = GAME_LOG_VERBOSITY >= LOG_ACTIONS
+        self.hand_history = HandHistoryWriter(log_filename + '.hh') if HAND_HISTORY else None
+        self.latency = LatencyRecorder() if LATENCY_REPORT else None
+        self.early_stop = SequentialTest(EARLY_STOP_CONFIDENCE, EARLY_STOP_EPSILON, EARLY_STOP_MIN_ROUNDS) if EARLY_STOP else None
+        self.actions = []
         self.player_messages = [[], []]
+        self.deltas = []
+        self.mirror_deltas = []
 
     def log_round_state(self, players, round_state):
         '''
         Incorporates RoundState information into the game log and player messages.
         '''
         if round_state.street == 0 and round_state.button == 0:
-            self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
-            self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
-            self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
-            self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0]), 'G' + round_state.bounties[0]]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1]), 'G' + round_state.bounties[1]]
+            if self.log_actions:
+                self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND), LOG_ACTIONS)
+                self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND), LOG_ACTIONS)
+                self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])), LOG_ACTIONS)
+                self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])), LOG_ACTIONS)
+            # pipelined players get the last round's result with the new deal
+            self.player_messages[0] = ['T0.'] + players[0].pending + ['P0', 'H' + CCARDS(round_state.hands[0]), 'G' + round_state.bounties[0]]
+            self.player_messages[1] = ['T0.'] + players[1].pending + ['P1', 'H' + CCARDS(round_state.hands[1]), 'G' + round_state.bounties[1]]
+            players[0].pending = []
+            players[1].pending = []
         elif round_state.street > 0 and round_state.button == 1:
-            board = round_state.deck.peek(round_state.street)
-            self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
-                            PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
-                            PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
-            self.log.append(f"Current stacks: {round_state.stacks[0]}, {round_state.stacks[1]}")
+            board = round_state.board[:round_state.street]
+            if self.log_actions:
+                self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
+                                PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
+                                PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]), LOG_ACTIONS)
+                self.log.append(f"Current stacks: {round_state.stacks[0]}, {round_state.stacks[1]}", LOG_ACTIONS)
             compressed_board = 'B' + CCARDS(board)
             self.player_messages[0].append(compressed_board)
             self.player_messages[1].append(compressed_board)
@@ -467,19 +1240,19 @@ class Game():
         '''
         Incorporates action information into the game log and player messages.
         '''
-        if isinstance(action, FoldAction):
-            phrasing = ' folds'
-            code = 'F'
-        elif isinstance(action, CallAction):
-            phrasing = ' calls'
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            phrasing = ' checks'
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
+        code = ENCODE.get(type(action).__name__)
+        if code is None:  # isinstance(action, RaiseAction)
             code = 'R' + str(action.amount)
-        self.log.append(name + phrasing)
+        if self.log_actions:
+            if isinstance(action, FoldAction):
+                phrasing = ' folds'
+            elif isinstance(action, CallAction):
+                phrasing = ' calls'
+            elif isinstance(action, CheckAction):
+                phrasing = ' checks'
+            else:  # isinstance(action, RaiseAction)
+                phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
+            self.log.append(name + phrasing, LOG_ACTIONS)
         self.player_messages[0].append(code)
         self.player_messages[1].append(code)
 
@@ -489,12 +1262,14 @@ class Game():
         '''
         previous_state = round_state.previous_state
         if FoldAction not in previous_state.legal_actions():
-            self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
-            self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
+            if self.log_actions:
+                self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])), LOG_ACTIONS)
+                self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])), LOG_ACTIONS)
             self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
             self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
-        self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
-        self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
+        if self.log_results:
+            self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
+            self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
         self.player_messages[0].append('D' + str(round_state.deltas[0]))
         self.player_messages[1].append('D' + str(round_state.deltas[1]))
 
@@ -516,28 +1291,185 @@ class Game():
         self.player_messages[0].append('Y' + hit_chars[0] + hit_chars[1])
         self.player_messages[1].append('Y' + hit_chars[1] + hit_chars[0])
 
-    def run_round(self, players, bounties):
+    def play_round(self, players, bounties, deck, round_num=0):
         '''
-        Runs one round of poker.
+        Plays one round of poker as a generator.
+
+        Yields a (player, round_state, player_message) query whenever a pokerbot must
+        respond and expects the player's action to be sent back, so the same round can
+        be driven by blocking or asynchronous players. Returns the terminal state.
         '''
-        deck = eval7.Deck()
-        deck.shuffle()
         hands = [deck.deal(2), deck.deal(2)]
-        pips = [SMALL_BLIND, BIG_BLIND]
-        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-        round_state = RoundState(0, 0, pips, stacks, hands, deck, bounties, None)
+        round_state = MutableRoundState(hands, deck, bounties)
+        record = self.hand_history is not None
+        del self.actions[:]
         while not isinstance(round_state, TerminalState):
             self.log_round_state(players, round_state)
             active = round_state.button % 2
             player = players[active]
-            action = player.query(round_state, self.player_messages[active], self.log)
+            action = yield player, round_state, self.player_messages[active]
+            if self.latency is not None:
+                self.latency.record_query(player.name, round_state.street, type(action).__name__[:-len('Action')].lower(),
+                                          round_num, player.query_time)
+            if record:
+                self.actions.append((ord(ENCODE.get(type(action).__name__, 'R')), active, round_state.street,
+                                     getattr(action, 'amount', 0), player.query_time))
             bet_override = (round_state.pips == [0, 0])
             self.log_action(player.name, action, bet_override)
             round_state = round_state.proceed(action)
         self.log_terminal_state(players, round_state)
         for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
-            player.query(round_state, player_message, self.log)
+            if player.pipelined:  # sent with the next deal instead of being acked
+                player.pending = player_message[1:]
+            else:
+                yield player, round_state, player_message
+                if self.latency is not None:
+                    self.latency.record_query(player.name, round_state.previous_state.street, 'round_over', round_num,
+                                              player.query_time)
             player.bankroll += delta
+        return round_state
+
+    def record_round(self, seed, round_num, mirror, sb_player, terminal_state):
+        '''
+        Writes the hand history record of the round that just ended.
+
+        Records index players as PLAYER_1 and PLAYER_2, so seat-ordered values are
+        swapped when PLAYER_2 sat in seat 0.
+        '''
+        by_player = (lambda pair: pair) if sb_player == 0 else (lambda pair: pair[::-1])
+        previous_state = terminal_state.previous_state
+        bounties = [CARD_NAMES.index(bounty) if bounty in CARD_NAMES else NO_RANK
+                    for bounty in by_player(previous_state.bounties)]
+        actions = [(code, seat ^ sb_player, street, amount, clock) for code, seat, street, amount, clock in self.actions]
+        seed = seed & (2 ** 63 - 1) if isinstance(seed, int) else -1  # any int seeds a DealStream; records hold 63 bits
+        self.hand_history.write(seed, round_num, mirror, sb_player,
+                                previous_state.street, FoldAction not in previous_state.legal_actions(),
+                                by_player(previous_state.hands), previous_state.board, bounties,
+                                by_player(terminal_state.deltas), by_player(terminal_state.bounty_hits), actions)
+
+    def start_players(self, log_suffix='', warm=False):
+        '''
+        Builds and runs both pokerbots, forking them from the warm pool if warm.
+        '''
+        player_class = InProcessPlayer if HEADLESS else Player
+        players = [
+            player_class(PLAYER_1_NAME, PLAYER_1_PATH, PLAYER_1_NAME + log_suffix + '.txt'),
+            player_class(PLAYER_2_NAME, PLAYER_2_PATH, PLAYER_2_NAME + log_suffix + '.txt')
+        ]
+        for player in players:
+            player.warm = warm
+            player.build()
+            player.run()
+        return players
+
+    def run_rounds(self, players, first_round, last_round, deals, mirror=False):
+        '''
+        Runs rounds first_round to last_round, where players[0] is PLAYER_1.
+
+        Drives play_rounds with blocking queries. Returns the players in their final order.
+        '''
+        rounds = self.play_rounds(players, first_round, last_round, deals, mirror)
+        try:
+            player, round_state, player_message = next(rounds)
+            while True:
+                action = player.query(round_state, player_message, self.log)
+                player, round_state, player_message = rounds.send(action)
+        except StopIteration as stop:
+            return stop.value
+
+    def play_rounds(self, players, first_round, last_round, deals, mirror=False):
+        '''
+        Plays rounds first_round to last_round as a generator of queries, like play_round.
+
+        Seats alternate with the round number, so a block that starts on an even
+        round starts with PLAYER_2 in seat 0. A mirrored block replays the same deals
+        with the seats swapped. With EARLY_STOP, an unmirrored block ends as soon as
+        the sequential test decides the match. Returns the players in their final order.
+        '''
+        player_1 = players[0]
+        if (first_round % 2 == 0) != mirror:
+            players = players[::-1]
+        bounties = [-1, -1]
+        deltas = self.mirror_deltas if mirror else self.deltas
+        for round_num in range(first_round, last_round + 1):
+            if self.log_results:
+                self.log.append('')
+                self.log.append('Round #' + str(round_num) + STATUS(players))
+            if round_num % ROUNDS_PER_BOUNTY == 1:
+                bounties = deals.bounties(round_num)
+                if self.log_results:
+                    self.log.append(f"Bounties reset to {bounties[0]} for player {players[0].name} and {bounties[1]} for player {players[1].name}")
+            bankroll = player_1.bankroll
+            start_time = time.perf_counter()
+            terminal_state = yield from self.play_round(players, bounties, deals.deck(round_num), round_num)
+            if self.latency is not None:
+                self.latency.record_round(round_num, time.perf_counter() - start_time, players, '.mirror' if mirror else '')
+            deltas.append(player_1.bankroll - bankroll)
+            if self.hand_history is not None:
+                self.record_round(deals.seed, round_num, mirror, 0 if players[0] is player_1 else 1, terminal_state)
+            if self.log_results:
+                self.log.append('Winning counts at the end of the round: ' + STATUS(players))
+
+            players = players[::-1]  # rotate first: an early stop returns the same order as a full block
+            bounties = bounties[::-1]
+            if self.early_stop is not None and not mirror and self.early_stop.update(deltas[-1]):
+                player_2 = players[1] if players[0] is player_1 else players[0]
+                message = 'Early stop after round {}: {}'.format(round_num, self.early_stop.describe(player_1.name, player_2.name))
+                self.log.append(message, LOG_FINAL)
+                print(message)
+                break
+        return players
+
+    def duplicate_result(self):
+        '''
+        Summarizes PLAYER_1's paired result over the deals played from both seats.
+        '''
+        paired = [delta + mirror_delta for delta, mirror_delta in zip(self.deltas, self.mirror_deltas)]
+        mean = sum(paired) / len(paired)
+        stderr = statistics.stdev(paired) / math.sqrt(len(paired)) if len(paired) > 1 else float('nan')
+        return {'deals': len(paired), 'total': sum(paired), 'mean': mean, 'stderr': stderr}
+
+    def run_shards(self):
+        '''
+        Splits the match into NUM_SHARDS blocks of rounds and plays them in parallel.
+
+        Returns the merged bankrolls and writes the per-shard seeds, bankrolls and
+        per-round deltas to a JSON report next to the game log.
+        '''
+        bounds = shard_bounds(NUM_ROUNDS, NUM_SHARDS)
+        # a shared MATCH_SEED deals every shard the same cards an unsharded match would get
+        seed_source = random.SystemRandom()
+        seeds = [MATCH_SEED if MATCH_SEED is not None else seed_source.getrandbits(32) for _ in bounds]
+        mirrors = [False, True] if DUPLICATE else [False]
+        tasks = [(shard, first_round, last_round, seed, mirror)
+                 for mirror in mirrors for shard, ((first_round, last_round), seed) in enumerate(zip(bounds, seeds))]
+        with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(run_shard, *task) for task in tasks]
+            results = [future.result() for future in futures]
+        bankrolls = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
+        report = {'num_rounds': NUM_ROUNDS, 'match_seed': MATCH_SEED, 'shards': []}
+        for (shard, first_round, last_round, seed, mirror), (log_filename, shard_bankrolls, deltas, latency) in zip(tasks, results):
+            self.log.append('', LOG_FINAL)
+            self.log.copy_from(log_filename)
+            if self.hand_history is not None:
+                self.hand_history.copy_from(GAME_LOG_FILENAME + shard_suffix(shard, mirror) + '.hh')
+            (self.mirror_deltas if mirror else self.deltas).extend(deltas)
+            if self.latency is not None:
+                self.latency.merge(latency)
+            for name in bankrolls:
+                bankrolls[name] += shard_bankrolls[name]
+            report['shards'].append({'shard': shard, 'first_round': first_round, 'last_round': last_round,
+                                     'seed': seed, 'mirror': mirror, 'bankrolls': shard_bankrolls})
+        report['bankrolls'] = bankrolls
+        report['deltas'] = {PLAYER_1_NAME: self.deltas}
+        if DUPLICATE:
+            report['mirror_deltas'] = {PLAYER_1_NAME: self.mirror_deltas}
+            report['duplicate'] = self.duplicate_result()
+        name = GAME_LOG_FILENAME + '.json'
+        print('Writing', name)
+        with open(name, 'w') as report_file:
+            json.dump(report, report_file)
+        return bankrolls
 
     def run(self):
         '''
@@ -549,35 +1481,104 @@ class Game():
         print('/_/  /_/___/ /_/   /_/   \\___/_/\\_\\\\__/_/ /_.__/\\___/\\__/___/')
         print()
         print('Starting the Pokerbots engine...')
-        players = [
-            Player(PLAYER_1_NAME, PLAYER_1_PATH),
-            Player(PLAYER_2_NAME, PLAYER_2_PATH)
-        ]
-        bounties = [-1, -1]
-        for player in players:
-            player.build()
-            player.run()
-        for round_num in range(1, NUM_ROUNDS + 1):
-            self.log.append('')
-            self.log.append('Round #' + str(round_num) + STATUS(players))
-            if round_num % ROUNDS_PER_BOUNTY == 1:
-                cardNames = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
-                bounties = [cardNames[random.randint(0, 12)], cardNames[random.randint(0, 12)]]
-                self.log.append(f"Bounties reset to {bounties[0]} for player {players[0].name} and {bounties[1]} for player {players[1].name}")
-            self.run_round(players, bounties)
-            self.log.append('Winning counts at the end of the round: ' + STATUS(players))
+        print('Writing', self.log.filename)
+        try:
+            self.play()
+        finally:
+            close_warm_bots()
+            self.log.close()
+            if self.hand_history is not None:
+                self.hand_history.close()
 
-            players = players[::-1]
-            bounties = bounties[::-1]
-        self.log.append('')
-        self.log.append('Final' + STATUS(players))
+    def play(self):
+        '''
+        Plays the match as configured and logs the final result.
+        '''
+        if NUM_SHARDS > 1:
+            bankrolls = self.run_shards()
+            self.log.append('', LOG_FINAL)
+            self.log.append('Final' + PVALUE(PLAYER_1_NAME, bankrolls[PLAYER_1_NAME]) +
+                            PVALUE(PLAYER_2_NAME, bankrolls[PLAYER_2_NAME]), LOG_FINAL)
+        else:
+            seed = MATCH_SEED
+            if seed is None and DUPLICATE:  # the mirrored half must replay the same deals
+                seed = random.SystemRandom().getrandbits(32)
+            deals = DealStream(seed, DECK_FILE)
+            warm = WARM_POOL and DUPLICATE  # only the mirrored half starts the pokerbots again
+            players = self.start_players(warm=warm)
+            players = self.run_rounds(players, 1, NUM_ROUNDS, deals)
+            for player in players:
+                player.stop()
+            if DUPLICATE:
+                self.log.append('', LOG_FINAL)
+                self.log.append('Duplicate match with seats swapped', LOG_FINAL)
+                mirror_players = self.start_players('.mirror', warm)
+                mirror_players = self.run_rounds(mirror_players, 1, len(self.deltas), deals, mirror=True)
+                for player in mirror_players:
+                    player.stop()
+                for player, mirror_player in zip(sorted(players, key=lambda p: p.name), sorted(mirror_players, key=lambda p: p.name)):
+                    player.bankroll += mirror_player.bankroll
+            self.log.append('', LOG_FINAL)
+            self.log.append('Final' + STATUS(players), LOG_FINAL)
+        if DUPLICATE:
+            result = self.duplicate_result()
+            self.log.append('Duplicate result over {} deals, {} ({:+.2f} per deal, standard error {:.2f})'.format(
+                result['deals'], PLAYER_1_NAME, result['mean'], result['stderr']), LOG_FINAL)
+        if self.latency is not None:
+            name = GAME_LOG_FILENAME + '.latency.json'
+            print('Writing', name)
+            with open(name, 'w') as report_file:
+                json.dump(self.latency.report(), report_file, indent=1)
+
+
+def shard_bounds(num_rounds, num_shards):
+    '''
+    Splits rounds 1 to num_rounds into at most num_shards contiguous blocks.
+
+    Blocks are whole multiples of ROUNDS_PER_BOUNTY, so every shard starts on a
+    bounty reset and its resets line up with those of the unsharded match.
+    '''
+    num_blocks = math.ceil(num_rounds / ROUNDS_PER_BOUNTY)
+    bounds = []
+    for shard in range(num_shards):
+        first_block = shard * num_blocks // num_shards
+        last_block = (shard + 1) * num_blocks // num_shards
+        if first_block < last_block:
+            bounds.append((first_block * ROUNDS_PER_BOUNTY + 1, min(last_block * ROUNDS_PER_BOUNTY, num_rounds)))
+    return bounds
+
+
+def shard_suffix(shard, mirror):
+    '''
+    Returns the suffix that tells a shard's log files apart.
+    '''
+    return '.shard' + str(shard) + ('.mirror' if mirror else '')
+
+
+def run_shard(shard, first_round, last_round, seed, mirror=False):
+    '''
+    Plays one shard of a match with its own seed and fresh pokerbots.
+
+    Runs in a worker process. Returns the filename of the shard's game log, final
+    bankrolls by player name, PLAYER_1's per-round deltas and the shard's latency
+    data (None unless LATENCY_REPORT is set).
+    '''
+    suffix = shard_suffix(shard, mirror)
+    game = Game(GAME_LOG_FILENAME + suffix, 'Shard {}{}: rounds {} to {}, seed {}'.format(
+        shard, ' (seats swapped)' if mirror else '', first_round, last_round, seed))
+    game.early_stop = None  # shards always play their whole block
+    try:
+        players = game.start_players(suffix)
+        players = game.run_rounds(players, first_round, last_round, DealStream(seed, DECK_FILE), mirror)
         for player in players:
             player.stop()
-        name = GAME_LOG_FILENAME + '.txt'
-        print('Writing', name)
-        with open(name, 'w') as log_file:
-            log_file.write('\n'.join(self.log))
-
+    finally:
+        close_warm_bots()
+        game.log.close()
+        if game.hand_history is not None:
+            game.hand_history.close()
+    return (game.log.filename, {player.name: player.bankroll for player in players},
+            game.mirror_deltas if mirror else game.deltas, game.latency.to_dict() if game.latency is not None else None)
 
 if __name__ == '__main__':
     Game().run()
@@ -0,0 +1,132 @@
+'''
+Fixed-width binary hand histories, one record per round.
+
+The engine writes records with the struct module alone. Analysis code can memory-map a
+whole file into a NumPy structured array and query every round at once, e.g. all
+rounds where PLAYER_2 raised on the river:
+
+    records = hand_history.load('gamelog.hh')
+    actions = records['actions']
+    mask = ((actions['street'] == 5) & (actions['code'] == ord('R')) & (actions['player'] == 1)).any(axis=1)
+
+Players are indexed 0 for PLAYER_1 and 1 for PLAYER_2 throughout; sb_player tells which
+of them sat in seat 0. Cards are 0-51 indices, suit * 13 + rank, matching the bit of
+eval7.Card.mask. Unused card, bounty and action slots are zero-filled except where noted.
+'''
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # the engine only needs the writer
+    np = None
+
+MAGIC = b'PBHH'
+VERSION = 1
+MAX_ACTIONS = 24  # rounds with more actions keep the first MAX_ACTIONS; num_actions holds the true count
+NO_RANK = 255
+
+HEADER_FORMAT = '<4sHHI4x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ACTION_FORMAT = 'BBBHf'
+RECORD_FORMAT = '<qIBBBB4B5B2B2h2BH' + ACTION_FORMAT * MAX_ACTIONS
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+EMPTY_ACTION = (0, 0, 0, 0, 0.)
+
+if np is not None:
+    ACTION_DTYPE = np.dtype([
+        ('code', 'u1'),      # ord('F'), ord('C'), ord('K') or ord('R')
+        ('player', 'u1'),
+        ('street', 'u1'),    # 0, 3, 4 or 5
+        ('amount', '<u2'),   # the raise-to amount, 0 for other actions
+        ('clock', '<f4'),    # seconds of game clock the response took
+    ])
+    RECORD_DTYPE = np.dtype([
+        ('seed', '<i8'),     # the deal seed's low 63 bits, -1 if unseeded
+        ('round', '<u4'),
+        ('mirror', 'u1'),    # 1 in the seats-swapped half of a duplicate match
+        ('sb_player', 'u1'),
+        ('street', 'u1'),    # the street the round ended on
+        ('showdown', 'u1'),
+        ('hands', 'u1', (2, 2)),
+        ('board', 'u1', (5,)),  # the full board as dealt, even if the round ended earlier
+        ('bounties', 'u1', (2,)),  # rank 0-12, NO_RANK if unset
+        ('deltas', '<i2', (2,)),
+        ('bounty_hits', 'u1', (2,)),
+        ('num_actions', '<u2'),
+        ('actions', ACTION_DTYPE, (MAX_ACTIONS,)),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+
+def card_index(card):
+    '''
+    Returns the 0-51 index of an eval7.Card.
+    '''
+    return card.suit * 13 + card.rank
+
+
+class HandHistoryWriter():
+    '''
+    Appends hand history records to a file.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.history_file = open(filename, 'wb')
+        self.history_file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, MAX_ACTIONS, RECORD_SIZE))
+
+    def write(self, seed, round_num, mirror, sb_player, street, showdown, hands, board,
+              bounties, deltas, bounty_hits, actions):
+        '''
+        Writes one round. Per-player arguments are ordered PLAYER_1, PLAYER_2; actions are
+        (code, player, street, amount, clock) tuples.
+        '''
+        fields = [seed, round_num, mirror, sb_player, street, showdown]
+        fields.extend(card_index(card) for hand in hands for card in hand)
+        fields.extend(card_index(card) for card in board)
+        fields.extend(bounties)
+        fields.extend(deltas)
+        fields.extend(bounty_hits)
+        fields.append(len(actions))
+        for action in actions[:MAX_ACTIONS]:
+            fields.extend(action)
+        for _ in range(len(actions), MAX_ACTIONS):
+            fields.extend(EMPTY_ACTION)
+        self.history_file.write(struct.pack(RECORD_FORMAT, *fields))
+
+    def copy_from(self, filename):
+        '''
+        Appends every record of another hand history, then deletes it.
+        '''
+        with open(filename, 'rb') as history_file:
+            read_header(history_file)
+            for chunk in iter(lambda: history_file.read(RECORD_SIZE * 4096), b''):
+                self.history_file.write(chunk)
+        os.remove(filename)
+
+    def close(self):
+        '''
+        Closes the file.
+        '''
+        self.history_file.close()
+
+
+def read_header(history_file):
+    '''
+    Reads and validates a hand history header.
+    '''
+    magic, version, max_actions, record_size = struct.unpack(HEADER_FORMAT, history_file.read(HEADER_SIZE))
+    if magic != MAGIC or version != VERSION or max_actions != MAX_ACTIONS or record_size != RECORD_SIZE:
+        raise ValueError('{} is not a version {} hand history'.format(history_file.name, VERSION))
+
+
+def load(filename):
+    '''
+    Memory-maps a hand history into a read-only NumPy structured array of RECORD_DTYPE.
+    '''
+    with open(filename, 'rb') as history_file:
+        read_header(history_file)
+    if os.path.getsize(filename) == HEADER_SIZE:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(filename, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE)
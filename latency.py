@@ -0,0 +1,175 @@
+'''
+Streaming latency histograms for the engine's per-query timings.
+
+Every query's latency is added to log-spaced buckets, so a histogram takes constant
+memory however long the match runs and quantiles are accurate to about 4%. Histograms
+from shards merge by adding bucket counts.
+'''
+import math
+
+BUCKETS_PER_OCTAVE = 16
+MIN_LATENCY = 1e-6  # seconds; faster queries share the lowest bucket
+QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+
+class LatencyHistogram():
+    '''
+    Counts latencies in log-spaced buckets and tracks their exact total and maximum.
+    '''
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.
+        self.maximum = 0.
+
+    def add(self, seconds):
+        '''
+        Adds one latency in seconds.
+        '''
+        bucket = 0 if seconds <= MIN_LATENCY else int(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_OCTAVE)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def merge(self, other):
+        '''
+        Adds the counts of another histogram to this one.
+        '''
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def quantile(self, q):
+        '''
+        Returns the upper edge of the bucket holding the q-th quantile, capped at the maximum.
+        '''
+        if self.count == 0:
+            return 0.
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.maximum, MIN_LATENCY * 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE))
+        return self.maximum
+
+    def summary(self):
+        '''
+        Returns the count, total, mean, quantiles and maximum in seconds.
+        '''
+        summary = {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.}
+        for name, q in QUANTILES:
+            summary[name] = self.quantile(q)
+        summary['max'] = self.maximum
+        return summary
+
+    def to_dict(self):
+        '''
+        Returns the histogram as a picklable dict, including its buckets.
+        '''
+        return {'buckets': self.buckets, 'count': self.count, 'total': self.total, 'maximum': self.maximum}
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+        Rebuilds a histogram from to_dict.
+        '''
+        histogram = cls()
+        histogram.buckets = dict(data['buckets'])
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.maximum = data['maximum']
+        return histogram
+
+
+class LatencyRecorder():
+    '''
+    Collects each player's query latencies by street, action and block of rounds, the
+    engine's own per-round overhead and the game clock left every curve_step rounds
+    and after the latest round.
+    '''
+
+    def __init__(self, round_block=100, curve_step=10):
+        self.round_block = round_block
+        self.curve_step = curve_step
+        self.histograms = {}
+        self.clock_curves = {}
+        self.round_query_time = 0.
+
+    def histogram(self, name, tag):
+        '''
+        Returns the histogram of one player (or 'engine') and tag, creating it if needed.
+        '''
+        histograms = self.histograms.setdefault(name, {})
+        if tag not in histograms:
+            histograms[tag] = LatencyHistogram()
+        return histograms[tag]
+
+    def round_tag(self, round_num):
+        '''
+        Returns the tag of the block of rounds that round_num belongs to.
+        '''
+        first_round = (round_num - 1) // self.round_block * self.round_block + 1
+        return 'rounds {}-{}'.format(first_round, first_round + self.round_block - 1)
+
+    def record_query(self, name, street, action, round_num, seconds):
+        '''
+        Records one query that took the player seconds to answer on a street, where
+        action names the response ('fold', 'call', 'check', 'raise' or 'round_over').
+        '''
+        self.histogram(name, 'all').add(seconds)
+        self.histogram(name, 'street ' + str(street)).add(seconds)
+        self.histogram(name, 'action ' + action).add(seconds)
+        self.histogram(name, self.round_tag(round_num)).add(seconds)
+        self.round_query_time += seconds
+
+    def record_round(self, round_num, seconds, players, curve_suffix=''):
+        '''
+        Records a round that took seconds of wall time in all. The time not spent in
+        queries is the engine's overhead. The players' remaining game clocks are added
+        to their clock-burn curves, replacing the latest point unless it is on the
+        curve_step grid of rounds 1, 1 + curve_step and so on.
+        '''
+        overhead = max(0., seconds - self.round_query_time)
+        self.histogram('engine', 'overhead per round').add(overhead)
+        self.histogram('engine', self.round_tag(round_num)).add(overhead)
+        self.round_query_time = 0.
+        for player in players:
+            curve = self.clock_curves.setdefault(player.name + curve_suffix, [])
+            if curve and (curve[-1][0] - 1) % self.curve_step:
+                curve[-1] = [round_num, player.game_clock]
+            else:
+                curve.append([round_num, player.game_clock])
+
+    def to_dict(self):
+        '''
+        Returns the recorder's data as a picklable dict, so shards can send it back.
+        '''
+        return {'histograms': {name: {tag: histogram.to_dict() for tag, histogram in histograms.items()}
+                               for name, histograms in self.histograms.items()},
+                'clock_curves': self.clock_curves}
+
+    def merge(self, data):
+        '''
+        Adds the data of another recorder's to_dict to this one.
+        '''
+        for name, histograms in data['histograms'].items():
+            for tag, histogram in histograms.items():
+                self.histogram(name, tag).merge(LatencyHistogram.from_dict(histogram))
+        for name, curve in data['clock_curves'].items():
+            self.clock_curves.setdefault(name, []).extend(curve)
+
+    def report(self):
+        '''
+        Returns the JSON report: summaries of every histogram, in seconds, and the
+        clock-burn curves as [round, game clock left] pairs ordered by round.
+        '''
+        return {
+            'latency': {name: {tag: histogram.summary() for tag, histogram in histograms.items()}
+                        for name, histograms in self.histograms.items()},
+            'clock_curves': {name: sorted(curve) for name, curve in self.clock_curves.items()},
+        }
@@ -0,0 +1,357 @@
+'''
+Hosts many matches at once on one asyncio event loop.
+
+Each match is an engine Game whose rounds are driven by Game.play_rounds, with the
+pokerbots' sockets and output handled as asyncio streams instead of threads and
+blocking reads, and game logs written from the loop instead of a writer thread each.
+
+Game clocks are charged like Player.query, from sending a message to the response
+becoming readable. On POSIX the loop runs on a ReadySelector, which stamps each socket
+when select reports it readable, so time the loop spends on other matches before it
+gets to a response is not charged to the pokerbot.
+
+    python match_host.py [pairings.json] [--concurrency N] [--repeat N]
+
+pairings.json lists matches as objects with player_1_name, player_1_path,
+player_2_name and player_2_path, and optionally log and seed. Without it the host
+plays the pairing in config.py. Each match writes its own game and player logs, and
+the host writes the final bankrolls and bot startup times of every match to
+match_host.json. With WARM_POOL every pokerbot path is started once, before the loop
+runs, and forked per match from a worker thread, so neither blocks the other matches.
+'''
+import argparse
+import asyncio
+import json
+import os
+import selectors
+import socket
+import tempfile
+import time
+
+from engine import Game, Player, DealStream, TerminalState, CheckAction, FoldAction, STATUS, LOG_FINAL, \
+    get_warm_bot, close_warm_bots, warm_bots
+from config import *
+
+
+class ReadySelector(selectors.DefaultSelector):
+    '''
+    The event loop's selector, recording when select last reported each file descriptor readable.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.ready_times = {}
+
+    def select(self, timeout=None):
+        events = super().select(timeout)
+        now = time.perf_counter()
+        for key, mask in events:
+            if mask & selectors.EVENT_READ:
+                self.ready_times[key.fd] = now
+        return events
+
+
+class AsyncPlayer(Player):
+    '''
+    Handles the subprocess and socket of one pokerbot with asyncio streams.
+
+    selector is the loop's ReadySelector, or None to charge the clock until the
+    response is read.
+    '''
+
+    def __init__(self, name, path, log_filename=None, selector=None):
+        super().__init__(name, path, log_filename)
+        self.reader = None
+        self.writer = None
+        self.output_task = None
+        self.selector = selector
+
+    def read_timeout(self):
+        '''
+        Returns the socket timeout Player.run would set.
+        '''
+        return PLAYER_TIMEOUT if self.path == r"./player_chatbot" else CONNECT_TIMEOUT
+
+    async def relay_output(self, stdout):
+        '''
+        Copies the pokerbot's output to its player log.
+        '''
+        async for line in stdout:
+            if self.path == r"./player_chatbot":
+                print(line.strip().decode("utf-8"))
+            else:
+                self.player_log.put(line)
+
+    async def start_bot(self, args, pass_fds=()):
+        '''
+        Starts the pokerbot subprocess with the transport arguments.
+        '''
+        self.bot_subprocess = await asyncio.create_subprocess_exec(
+            *(self.commands['run'] + args), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            cwd=self.path, pass_fds=pass_fds)
+        self.output_task = asyncio.ensure_future(self.relay_output(self.bot_subprocess.stdout))
+
+    async def run(self):
+        '''
+        Runs the pokerbot and waits for its connection over TRANSPORT, or forks it from
+        the warm pool started by start_warm_bots, as Player.run does.
+        '''
+        if self.commands is None or len(self.commands['run']) == 0:
+            return
+        transport = TRANSPORT if TRANSPORT in ('unix', 'socketpair') and os.name == 'posix' else 'tcp'
+        socket_dir = None
+        server = None
+        start_time = time.perf_counter()
+        try:
+            warm_bot = warm_bots.get(self.path) if WARM_POOL else None
+            if warm_bot is not None:
+                loop = asyncio.get_running_loop()
+                client_socket, output = await loop.run_in_executor(None, warm_bot.fork)  # waits on the fork server
+                stdout = asyncio.StreamReader()
+                await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdout), output)
+                self.output_task = asyncio.ensure_future(self.relay_output(stdout))
+                self.reader, self.writer = await asyncio.open_connection(sock=client_socket)
+            elif transport == 'socketpair':
+                client_socket, bot_socket = socket.socketpair()
+                with bot_socket:
+                    await self.start_bot(['--fd', str(bot_socket.fileno())], pass_fds=(bot_socket.fileno(),))
+                self.reader, self.writer = await asyncio.open_connection(sock=client_socket)
+            else:
+                connected = asyncio.get_running_loop().create_future()
+
+                def accept(reader, writer):
+                    if not connected.done():
+                        connected.set_result((reader, writer))
+
+                if transport == 'unix':
+                    socket_dir = tempfile.mkdtemp(prefix='pokerbots-')
+                    address = os.path.join(socket_dir, 'bot.sock')
+                    server = await asyncio.start_unix_server(accept, address)
+                    args = ['--unix', address]
+                else:
+                    server = await asyncio.start_server(accept, '', 0, family=socket.AF_INET)
+                    args = [str(server.sockets[0].getsockname()[1])]
+                await self.start_bot(args)
+                # block until we timeout or the player connects
+                self.reader, self.writer = await asyncio.wait_for(connected, CONNECT_TIMEOUT)
+                if transport == 'tcp':
+                    self.writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if PIPELINE_ROUNDS:
+                self.writer.write(b'V1\n')
+                await self.writer.drain()
+                self.pipelined = (await asyncio.wait_for(self.reader.readline(), CONNECT_TIMEOUT)).strip() == b'V1'
+            self.startup_time = time.perf_counter() - start_time
+            print(self.name, 'connected successfully in {:.3f}s'.format(self.startup_time))
+        except (TypeError, ValueError):
+            print(self.name, 'run command misformatted')
+        except asyncio.TimeoutError:
+            print('Timed out waiting for', self.name, 'to connect')
+        except OSError:
+            print(self.name, 'run failed - check "run" in commands.json')
+        finally:
+            if server is not None:
+                server.close()
+            if socket_dir is not None:
+                for filename in os.listdir(socket_dir):
+                    os.remove(os.path.join(socket_dir, filename))
+                os.rmdir(socket_dir)
+
+    async def stop(self):
+        '''
+        Closes the socket connection and stops the pokerbot.
+        '''
+        if self.writer is not None:
+            try:
+                self.writer.write((' '.join(self.pending + ['Q']) + '\n').encode())
+                await asyncio.wait_for(self.writer.drain(), self.read_timeout())
+                self.writer.close()
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to disconnect')
+            except OSError:
+                print('Could not close socket connection with', self.name)
+        if self.bot_subprocess is not None:
+            try:
+                await asyncio.wait_for(self.bot_subprocess.wait(), self.read_timeout())
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to quit')
+                self.bot_subprocess.kill()
+                await self.bot_subprocess.wait()
+        if self.output_task is not None:
+            try:
+                await asyncio.wait_for(self.output_task, self.read_timeout())
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to quit')
+        self.player_log.close()
+
+    async def query(self, round_state, player_message, game_log):
+        '''
+        Requests one action from the pokerbot over its asyncio stream.
+
+        Mirrors Player.query: the game clock is charged the time from sending the
+        message to the response becoming readable, and a read that takes longer than
+        the socket timeout counts as running out of time.
+        '''
+        legal_actions = {CheckAction} if isinstance(round_state, TerminalState) else round_state.legal_actions()
+        self.query_time = 0.
+        if self.writer is not None and self.game_clock > 0.:
+            clause = ''
+            try:
+                player_message[0] = 'T{:.3f}'.format(self.game_clock)
+                message = ' '.join(player_message) + '\n'
+                del player_message[1:]  # do not send redundant action history
+                start_time = time.perf_counter()
+                self.writer.write(message.encode())
+                await self.writer.drain()
+                clause = (await asyncio.wait_for(self.reader.readline(), self.read_timeout())).decode().strip()
+                end_time = time.perf_counter()
+                if self.selector is not None:
+                    ready_time = self.selector.ready_times.get(self.writer.get_extra_info('socket').fileno())
+                    if ready_time is not None:
+                        end_time = min(end_time, max(start_time, ready_time))
+                self.query_time = end_time - start_time
+                if ENFORCE_GAME_CLOCK and self.path != r"./player_chatbot":
+                    self.game_clock -= end_time - start_time
+                if self.game_clock <= 0.:
+                    raise asyncio.TimeoutError
+                action = self.decode_action(clause, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
+            except asyncio.TimeoutError:
+                error_message = self.name + ' ran out of time'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+            except OSError:
+                error_message = self.name + ' disconnected'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+            except (IndexError, KeyError, ValueError):
+                game_log.append(self.name + ' response misformatted: ' + str(clause))
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+async def play_match(pairing, semaphore, selector=None):
+    '''
+    Plays one match of NUM_ROUNDS rounds and returns its final bankrolls.
+    '''
+    async with semaphore:
+        log_filename = pairing['log']
+        game = Game(log_filename, '6.9630 MIT Pokerbots - ' + pairing['player_1_name'] + ' vs ' + pairing['player_2_name'],
+                    background_log=False)
+        players = [
+            AsyncPlayer(pairing['player_1_name'], pairing['player_1_path'],
+                        log_filename + '.' + pairing['player_1_name'] + '.txt', selector),
+            AsyncPlayer(pairing['player_2_name'], pairing['player_2_path'],
+                        log_filename + '.' + pairing['player_2_name'] + '.txt', selector)
+        ]
+        try:
+            loop = asyncio.get_running_loop()
+            for player in players:
+                await loop.run_in_executor(None, player.build)
+            await asyncio.gather(*(player.run() for player in players))
+            rounds = game.play_rounds(players, 1, NUM_ROUNDS, DealStream(pairing.get('seed'), DECK_FILE))
+            try:
+                player, round_state, player_message = next(rounds)
+                while True:
+                    action = await player.query(round_state, player_message, game.log)
+                    player, round_state, player_message = rounds.send(action)
+            except StopIteration as stop:
+                players = stop.value
+            await asyncio.gather(*(player.stop() for player in players))
+            game.log.append('', LOG_FINAL)
+            game.log.append('Final' + STATUS(players), LOG_FINAL)
+        finally:
+            game.log.close()
+            if game.hand_history is not None:
+                game.hand_history.close()
+        return {'log': game.log.filename, 'seed': pairing.get('seed'), 'rounds': len(game.deltas),
+                'bankrolls': {player.name: player.bankroll for player in players},
+                'startup_times': {player.name: player.startup_time for player in players}}
+
+
+def read_pairings(filename, repeat):
+    '''
+    Returns the pairings to play, each repeated repeat times with its own log.
+    '''
+    if filename is None:
+        pairings = [{'player_1_name': PLAYER_1_NAME, 'player_1_path': PLAYER_1_PATH,
+                     'player_2_name': PLAYER_2_NAME, 'player_2_path': PLAYER_2_PATH, 'seed': MATCH_SEED}]
+    else:
+        with open(filename, 'r') as json_file:
+            pairings = json.load(json_file)
+    matches = []
+    for index, pairing in enumerate(pairings):
+        for repetition in range(repeat):
+            match = dict(pairing)
+            log = pairing.get('log', GAME_LOG_FILENAME + '.match' + str(index))
+            match['log'] = log + ('.' + str(repetition) if repeat > 1 else '')
+            matches.append(match)
+    return matches
+
+
+async def host(matches, concurrency, selector=None):
+    '''
+    Plays every match, at most concurrency of them at a time.
+    '''
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(play_match(match, semaphore, selector) for match in matches))
+
+
+def start_warm_bots(matches):
+    '''
+    Builds every pokerbot path of the matches once and starts its fork server.
+
+    Starting one blocks until it reports ready, so it must happen before the loop runs.
+    '''
+    for match in matches:
+        for seat in ('player_1', 'player_2'):
+            name, path = match[seat + '_name'], match[seat + '_path']
+            if path in warm_bots:
+                continue
+            player = Player(name, path, match['log'] + '.' + name + '.txt')  # the match's own build rewrites this log
+            player.build()
+            player.player_log.close()
+            if player.commands is not None and len(player.commands['run']) > 0:
+                get_warm_bot(name, path, player.commands)
+
+
+def run_host(matches, concurrency):
+    '''
+    Runs host on a ReadySelector event loop, or on asyncio's default loop off POSIX.
+    '''
+    if WARM_POOL:
+        start_warm_bots(matches)
+    if os.name != 'posix':  # subprocesses need the proactor loop on Windows
+        return asyncio.run(host(matches, concurrency))
+    selector = ReadySelector()
+    loop = asyncio.SelectorEventLoop(selector)
+    asyncio.set_event_loop(loop)
+    try:
+        results = loop.run_until_complete(host(matches, concurrency, selector))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        return results
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 match_host.py')
+    parser.add_argument('pairings', nargs='?', help='JSON list of pairings, defaults to the pairing in config.py')
+    parser.add_argument('--concurrency', type=int, default=64, help='Matches played at once, defaults to 64')
+    parser.add_argument('--repeat', type=int, default=1, help='Matches played per pairing, defaults to 1')
+    args = parser.parse_args()
+    matches = read_pairings(args.pairings, args.repeat)
+    print('Hosting', len(matches), 'matches,', args.concurrency, 'at a time')
+    try:
+        results = run_host(matches, args.concurrency)
+    finally:
+        close_warm_bots()
+    print('Writing match_host.json')
+    with open('match_host.json', 'w') as report_file:
+        json.dump(results, report_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
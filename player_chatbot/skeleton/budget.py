@@ -0,0 +1,90 @@
+'''
+Splits the game clock into per-decision time slices for anytime computations.
+
+The engine sends the game clock left on every packet. A Budget turns it into a slice
+for the current decision from the rounds left and the street, learning how many
+decisions a round takes from the match so far:
+
+    deadline = self.budget.start(game_state, round_state.street)
+    if deadline.exhausted:
+        return fallback_action
+    for estimate in monte_carlo_equity(...):  # an anytime computation
+        if deadline.expired():
+            break
+
+and self.budget.end_round() from handle_round_over.
+'''
+import time
+
+from .states import NUM_ROUNDS
+
+STREET_WEIGHTS = {0: 0.5, 3: 1.5, 4: 1.2, 5: 1.0}  # relative worth of thinking time per decision
+
+
+class Deadline():
+    '''
+    The end of one decision's time slice, on time.perf_counter().
+    '''
+    __slots__ = ('start', 'end', 'exhausted')
+
+    def __init__(self, seconds, exhausted=False):
+        self.start = time.perf_counter()
+        self.end = self.start + seconds
+        self.exhausted = exhausted
+
+    def remaining(self):
+        return self.end - time.perf_counter()
+
+    def expired(self):
+        return time.perf_counter() >= self.end
+
+
+class Budget():
+    '''
+    Allocates time slices from the game clock.
+
+    reserve seconds are never allocated and cover the Runner, the network and the
+    pokerbot's own bookkeeping; safety is the fraction of the rest that slices may use.
+    A decision whose slice would be under min_slice is exhausted: return the fallback.
+    '''
+
+    def __init__(self, num_rounds=NUM_ROUNDS, reserve=1., safety=0.8, min_slice=0.0002, max_slice=0.5):
+        self.num_rounds = num_rounds
+        self.reserve = reserve
+        self.safety = safety
+        self.min_slice = min_slice
+        self.max_slice = max_slice
+        self.decisions = {street: 1. for street in STREET_WEIGHTS}  # per round, with a prior of one each
+        self.round_decisions = {street: 0 for street in STREET_WEIGHTS}
+        self.rounds = 1
+
+    def units_per_round(self):
+        '''
+        Returns the expected weighted decisions in one round.
+        '''
+        return sum(STREET_WEIGHTS[street] * count / self.rounds for street, count in self.decisions.items())
+
+    def time_slice(self, game_state, street):
+        '''
+        Returns the seconds to spend on a decision on street.
+        '''
+        rounds_left = max(1, self.num_rounds - game_state.round_num + 1)
+        spendable = (game_state.game_clock - self.reserve) * self.safety
+        return min(self.max_slice, spendable * STREET_WEIGHTS[street] / (rounds_left * self.units_per_round()))
+
+    def start(self, game_state, street):
+        '''
+        Records a decision on street and returns its Deadline.
+        '''
+        self.round_decisions[street] += 1
+        seconds = self.time_slice(game_state, street)
+        return Deadline(max(seconds, 0.), seconds < self.min_slice)
+
+    def end_round(self):
+        '''
+        Adds the finished round's decisions to the per-round averages.
+        '''
+        for street, count in self.round_decisions.items():
+            self.decisions[street] += count
+            self.round_decisions[street] = 0
+        self.rounds += 1
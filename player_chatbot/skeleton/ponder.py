@@ -0,0 +1,96 @@
+'''
+Background work for the pokerbot while the Runner waits for the engine.
+
+The engine charges the game clock from sending a packet until it reads the response,
+so the time spent blocked on the socket in between is free. A pokerbot's Bot.ponder
+returns a generator of work, for example equity for the likely turn cards, and a
+worker thread steps it only while the Runner is blocked on readline:
+
+    def ponder(self, game_state, round_state, active):
+        if round_state is not None and round_state.street == 3:
+            return self.turn_equities(round_state, active)  # stores results in self.cache, a step at a time
+
+When a packet arrives the Runner pauses the worker before handling it. The step in
+progress is finished first, on the game clock, so keep steps short. Results are handed
+over through the pokerbot's own attributes, which get_action can read safely since no
+step runs while a callback does. Work that releases the GIL (eval7, NumPy) overlaps
+best with the Runner's own socket reads.
+'''
+import threading
+import traceback
+
+
+class Ponderer():
+    '''
+    Steps one generator at a time in a daemon thread, between start() and pause().
+    '''
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.task = None
+        self.running = False
+        self.stepping = False
+        self.closed = False
+        self.thread = None
+
+    def start(self, task):
+        '''
+        Resumes stepping task. A task other than the current one replaces it, and the
+        current one is closed; None leaves nothing to run.
+        '''
+        self.pause()
+        with self.condition:
+            if task is not self.task:
+                if self.task is not None:
+                    self.task.close()
+                self.task = task
+            self.running = task is not None
+            if self.running and self.thread is None:
+                self.thread = threading.Thread(target=self.work, daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def pause(self):
+        '''
+        Stops stepping and waits for the step in progress to finish.
+        '''
+        with self.condition:
+            self.running = False
+            while self.stepping:
+                self.condition.wait()
+
+    def stop(self):
+        '''
+        Closes the current task and ends the worker thread.
+        '''
+        self.pause()
+        with self.condition:
+            self.closed = True
+            if self.task is not None:
+                self.task.close()
+                self.task = None
+            self.condition.notify_all()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not self.running and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                task = self.task
+                self.stepping = True
+            finished = False
+            try:
+                next(task)
+            except StopIteration:
+                finished = True
+            except Exception:
+                traceback.print_exc()
+                finished = True
+            with self.condition:
+                self.stepping = False
+                if finished and self.task is task:
+                    self.task = None
+                    self.running = False
+                self.condition.notify_all()
@@ -2,11 +2,18 @@
 The infrastructure for interacting with the engine.
 '''
 import argparse
+import os
+import random
+import signal
 import socket
+import sys
+import traceback
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
-from .states import GameState, TerminalState, RoundState
+from .states import GameState, TerminalState, MutableRoundState
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from .bot import Bot
+from .cards import CardState, parse_cards, card_names
+from .ponder import Ponderer
 
 
 class Runner():
@@ -17,13 +24,30 @@ class Runner():
     def __init__(self, pokerbot, socketfile):
         self.pokerbot = pokerbot
         self.socketfile = socketfile
+        self.bankroll = 0
+        self.game_clock = 0.
+        self.round_num = 1
+        self.active = 0
+        self.round_state = None
+        self.round_over = False
+        self.deltas = None
+        self.round_flag = True
+        self.handlers = {'T': self.handle_time, 'P': self.handle_seat, 'H': self.handle_hand, 'G': self.handle_bounty,
+                         'F': self.handle_fold, 'C': self.handle_call, 'K': self.handle_check, 'R': self.handle_raise,
+                         'B': self.handle_board, 'O': self.handle_reveal, 'D': self.handle_delta,
+                         'Y': self.handle_bounty_hits, 'Q': self.handle_quit}
+        # only pokerbots that override Bot.ponder get a worker thread
+        self.ponderer = Ponderer() if getattr(type(pokerbot), 'ponder', Bot.ponder) is not Bot.ponder else None
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
         '''
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
+            line = self.socketfile.readline()
+            if self.ponderer is not None:
+                self.ponderer.pause()
+            packet = line.strip().split(' ')
             if not packet:
                 break
             yield packet
@@ -43,79 +67,109 @@ class Runner():
         self.socketfile.write(code + '\n')
         self.socketfile.flush()
 
+    def game_state(self):
+        return GameState(self.bankroll, self.game_clock, self.round_num)
+
+    def handle_time(self, clause):
+        self.game_clock = float(clause[1:])
+
+    def handle_seat(self, clause):
+        self.active = int(float(clause[1:]))
+
+    def handle_hand(self, clause):
+        hands = [[], []]
+        hand_cards = [[], []]
+        hand_cards[self.active] = parse_cards(clause[1:])
+        hands[self.active] = card_names(hand_cards[self.active])
+        self.round_state = MutableRoundState(hands, CardState.from_cards(hand_cards, []))
+        self.round_over = False
+
+    def handle_bounty(self, clause):
+        bounties = ['-1', '-1']
+        bounties[self.active] = clause[1:]
+        self.round_state.bounties = bounties
+        if self.round_flag:
+            self.pokerbot.handle_new_round(self.game_state(), self.round_state.view(), self.active)
+            self.round_flag = False
+
+    def handle_fold(self, clause):
+        self.round_over = True
+
+    def handle_call(self, clause):
+        self.round_over = self.round_state.call()
+
+    def handle_check(self, clause):
+        self.round_over = self.round_state.check()
+
+    def handle_raise(self, clause):
+        self.round_over = self.round_state.raise_to(int(float(clause[1:])))
+
+    def handle_board(self, clause):
+        board = parse_cards(clause[1:])
+        self.round_state.deck = card_names(board)
+        self.round_state.cards = self.round_state.cards.with_board(board)
+
+    def handle_reveal(self, clause):
+        opponent_hand = parse_cards(clause[1:])
+        revised_hands = list(self.round_state.hands)
+        revised_hands[1-self.active] = card_names(opponent_hand)
+        self.round_state.hands = revised_hands
+        self.round_state.cards = self.round_state.cards.with_hand(1-self.active, opponent_hand)
+
+    def handle_delta(self, clause):
+        assert self.round_over
+        delta = int(float(clause[1:]))
+        self.deltas = [-delta, -delta]
+        self.deltas[self.active] = delta
+        self.bankroll += delta
+
+    def handle_bounty_hits(self, clause):
+        assert self.round_over
+        hero_hit_bounty, opponent_hit_bounty = (clause[1] == '1'), (clause[2] == '1')
+        if self.active == 1:
+            hero_hit_bounty, opponent_hit_bounty = opponent_hit_bounty, hero_hit_bounty
+        terminal_state = TerminalState(self.deltas, [hero_hit_bounty, opponent_hit_bounty], self.round_state.view())
+        self.pokerbot.handle_round_over(self.game_state(), terminal_state, self.active)
+        self.round_num += 1
+        self.round_flag = True
+
+    def handle_quit(self, clause):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+        return True
+
+    def ponder(self):
+        '''
+        Hands the pokerbot's background work to the ponderer until the next packet arrives.
+        '''
+        round_state = None if self.round_flag else self.round_state.view()
+        self.ponderer.start(self.pokerbot.ponder(self.game_state(), round_state, self.active))
+
     def run(self):
         '''
-        Reconstructs the game tree based on the action history received from the engine.
+        Tracks the game tree from the action history received from the engine.
+
+        Each clause is dispatched on its first letter and applied in place to the
+        round state; the pokerbot is given read-only RoundState views.
         '''
-        game_state = GameState(0, 0., 1)
-        round_state = None
-        active = 0
-        round_flag = True
+        handlers = self.handlers
         for packet in self.receive():
+            if packet == ['V1']:  # accept the engine's pipelined protocol
+                self.socketfile.write('V1\n')
+                self.socketfile.flush()
+                continue
             for clause in packet:
-                if clause[0] == 'T':
-                    game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
-                elif clause[0] == 'P':
-                    active = int(float(clause[1:]))
-                elif clause[0] == 'H':
-                    hands = [[], []]
-
-                    hands[active] = clause[1:].split(',')
-                    pips = [SMALL_BLIND, BIG_BLIND]
-                    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-                    round_state = RoundState(0, 0, pips, stacks, hands, None, [], None)
-                elif clause[0] == 'G':
-                    bounties = ['-1', '-1']
-                    bounties[active] = clause[1:]
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             round_state.hands, bounties, round_state.deck, round_state.previous_state)
-                    if round_flag:
-                        self.pokerbot.handle_new_round(game_state, round_state, active)
-                        round_flag = False
-                elif clause[0] == 'F':
-                    round_state = round_state.proceed(FoldAction())
-                elif clause[0] == 'C':
-                    round_state = round_state.proceed(CallAction())
-                elif clause[0] == 'K':
-                    round_state = round_state.proceed(CheckAction())
-                elif clause[0] == 'R':
-                    round_state = round_state.proceed(RaiseAction(int(float(clause[1:]))))
-                elif clause[0] == 'B':
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             round_state.hands, round_state.bounties, clause[1:].split(','), round_state.previous_state)
-                elif clause[0] == 'O':
-                    # backtrack
-                    round_state = round_state.previous_state
-                    revised_hands = list(round_state.hands)
-                    revised_hands[1-active] = clause[1:].split(',')
-                    # rebuild history
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             revised_hands, round_state.bounties, round_state.deck, round_state.previous_state)
-                    round_state = TerminalState([0, 0], None, round_state)
-                elif clause[0] == 'D':
-                    assert isinstance(round_state, TerminalState)
-                    delta = int(float(clause[1:]))
-                    deltas = [-delta, -delta]
-                    deltas[active] = delta
-                    round_state = TerminalState(deltas, None, round_state.previous_state)
-                    game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
-                elif clause[0] == 'Y':
-                    assert isinstance(round_state, TerminalState)
-                    hero_hit_bounty, opponent_hit_bounty = (clause[1] == '1'), (clause[2] == '1')
-                    if active == 1:
-                        hero_hit_bounty, opponent_hit_bounty = opponent_hit_bounty, hero_hit_bounty
-                    round_state = TerminalState(round_state.deltas, [hero_hit_bounty, opponent_hit_bounty], round_state.previous_state)
-                    self.pokerbot.handle_round_over(game_state, round_state, active)
-                    game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
-                    round_flag = True
-                elif clause[0] == 'Q':
+                handler = handlers.get(clause[0])
+                if handler is not None and handler(clause):  # unknown clauses are ignored
                     return
-            if round_flag:  # ack the engine
+            if self.round_flag:  # ack the engine
                 self.send(CheckAction())
             else:
-                assert active == round_state.button % 2
-                action = self.pokerbot.get_action(game_state, round_state, active)
+                assert self.active == self.round_state.button % 2
+                action = self.pokerbot.get_action(self.game_state(), self.round_state.view(), self.active)
                 self.send(action)
+            if self.ponderer is not None:
+                self.ponder()
 
 
 def parse_args():
@@ -124,21 +178,87 @@ def parse_args():
     '''
     parser = argparse.ArgumentParser(prog='python3 player.py')
     parser.add_argument('--host', type=str, default='localhost', help='Host to connect to, defaults to localhost')
-    parser.add_argument('port', type=int, help='Port on host to connect to')
-    return parser.parse_args()
+    parser.add_argument('--unix', type=str, help='Unix domain socket to connect to instead of host and port')
+    parser.add_argument('--fd', type=int, help='File descriptor of a connected socket inherited from the engine')
+    parser.add_argument('--fork-server', action='store_true',
+                        help='Fork the pokerbot for every match the engine\'s warm pool sends over --fd')
+    parser.add_argument('port', type=int, nargs='?', help='Port on host to connect to')
+    args = parser.parse_args()
+    if args.port is None and args.unix is None and args.fd is None:
+        parser.error('one of port, --unix or --fd is required')
+    return args
 
 def run_bot(pokerbot, args):
     '''
     Runs the pokerbot.
     '''
     assert isinstance(pokerbot, Bot)
+    if args.fork_server:
+        serve_forks(pokerbot, socket.socket(fileno=args.fd))
+        return
     try:
-        sock = socket.create_connection((args.host, args.port))
+        if args.fd is not None:
+            sock = socket.socket(fileno=args.fd)
+        elif args.unix is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(args.unix)
+        else:
+            sock = socket.create_connection((args.host, args.port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     except OSError:
-        print('Could not connect to {}:{}'.format(args.host, args.port))
+        if args.fd is not None:
+            print('Could not use socket {}'.format(args.fd))
+        elif args.unix is not None:
+            print('Could not connect to {}'.format(args.unix))
+        else:
+            print('Could not connect to {}:{}'.format(args.host, args.port))
         return
     socketfile = sock.makefile('rw')
     runner = Runner(pokerbot, socketfile)
     runner.run()
     socketfile.close()
     sock.close()
+
+def serve_forks(pokerbot, control):
+    '''
+    Serves the engine's warm pool: forks a fresh copy of the constructed pokerbot for
+    every match and plays it on the game socket and output pipe the engine sends.
+    '''
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # children are reaped automatically
+    sys.stdout.flush()
+    control.sendall(b'R\n')
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, 1, 2)
+        if not message:
+            break
+        game_fd, output_fd = fds
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            os.dup2(output_fd, 1)
+            os.dup2(output_fd, 2)
+            os.close(output_fd)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            # a fresh process would have drawn its own seeds
+            random.seed()
+            if 'numpy' in sys.modules:
+                sys.modules['numpy'].random.seed()
+            status = 0
+            try:
+                sock = socket.socket(fileno=game_fd)
+                socketfile = sock.makefile('rw')
+                Runner(pokerbot, socketfile).run()
+                socketfile.close()
+                sock.close()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        os.close(game_fd)
+        os.close(output_fd)
+        control.sendall('F{}\n'.format(pid).encode())
@@ -3,6 +3,7 @@ Encapsulates game and round state information for the player.
 '''
 from collections import namedtuple
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .cards import CardState
 
 GameState = namedtuple('GameState', ['bankroll', 'game_clock', 'round_num'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'bounty_hits', 'previous_state'])
@@ -13,10 +14,20 @@ BIG_BLIND = 2
 SMALL_BLIND = 1
 
 
-class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks', 'hands', 'bounties', 'deck', 'previous_state'])):
+class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks', 'hands', 'bounties', 'deck', 'previous_state', 'cards'],
+                            defaults=[None])):
     '''
     Encodes the game tree for one round of poker.
+
+    hands and deck hold card names like 'Ah'; cards holds the same cards as a CardState
+    of ints and masks.
     '''
+
+    def card_state(self):
+        '''
+        Returns the CardState of the round, building it from the card names if it was not given.
+        '''
+        return self.cards if self.cards is not None else CardState.from_names(self.hands, self.deck)
     
     def get_bounty_hits(self):
         '''
@@ -31,10 +42,8 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
                 - First boolean indicates if Player 1's bounty was hit
                 - Second boolean indicates if Player 2's bounty was hit
         '''
-        cards0 = self.hands[0] + self.deck
-        cards1 = self.hands[1] + self.deck
-        return (self.bounties[0] in [card[0] for card in cards0],
-                self.bounties[1] in [card[0] for card in cards1])
+        cards = self.card_state()
+        return (cards.bounty_hit(0, self.bounties[0]), cards.bounty_hit(1, self.bounties[1]))
 
     def showdown(self):
         '''
@@ -74,7 +83,7 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         if self.street == 5:
             return self.showdown()
         new_street = 3 if self.street == 0 else self.street + 1
-        return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.bounties, self.deck, self)
+        return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.bounties, self.deck, self, self.cards)
 
     def proceed(self, action):
         '''
@@ -86,24 +95,138 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
             return TerminalState([delta, -delta], self.get_bounty_hits(), self)
         if isinstance(action, CallAction):
             if self.button == 0:  # sb calls bb
-                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.bounties, self.deck, self)
+                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.bounties, self.deck, self, self.cards)
             # both players acted
             new_pips = list(self.pips)
             new_stacks = list(self.stacks)
             contribution = new_pips[1-active] - new_pips[active]
             new_stacks[active] -= contribution
             new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.bounties, self.deck, self)
+            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.bounties, self.deck, self, self.cards)
             return state.proceed_street()
         if isinstance(action, CheckAction):
             if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
                 return self.proceed_street()
             # let opponent act
-            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.bounties, self.deck, self)
+            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.bounties, self.deck, self, self.cards)
         # isinstance(action, RaiseAction)
         new_pips = list(self.pips)
         new_stacks = list(self.stacks)
         contribution = action.amount - new_pips[active]
         new_stacks[active] -= contribution
         new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.bounties, self.deck, self)
+        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.bounties, self.deck, self, self.cards)
+
+
+class MutableRoundState():
+    '''
+    The Runner's round state, updated in place as clauses arrive.
+
+    Every action that RoundState.proceed answers with a new state first pushes a
+    snapshot of the current one onto history, so view() can rebuild the same read-only
+    RoundState, previous_state chain included, only when the pokerbot needs it.
+    '''
+    __slots__ = ('button', 'street', 'pips', 'stacks', 'hands', 'bounties', 'deck', 'cards', 'history', 'views')
+
+    def __init__(self, hands, cards):
+        self.button = 0
+        self.street = 0
+        self.pips = [SMALL_BLIND, BIG_BLIND]
+        self.stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.hands = hands
+        self.bounties = None
+        self.deck = []
+        self.cards = cards
+        self.history = []
+        self.views = []
+
+    def snapshot(self):
+        return (self.button, self.street, self.pips[0], self.pips[1], self.stacks[0], self.stacks[1],
+                self.hands, self.deck, self.cards)
+
+    def push(self):
+        self.history.append(self.snapshot())
+
+    def snapshot_view(self, snapshot, previous_state):
+        button, street, pip0, pip1, stack0, stack1, hands, deck, cards = snapshot
+        return RoundState(button, street, [pip0, pip1], [stack0, stack1], hands, self.bounties, deck, previous_state, cards)
+
+    def view(self):
+        '''
+        Returns the current state as a RoundState. Earlier states are built once per round.
+        '''
+        for snapshot in self.history[len(self.views):]:
+            self.views.append(self.snapshot_view(snapshot, self.views[-1] if self.views else None))
+        return self.snapshot_view(self.snapshot(), self.views[-1] if self.views else None)
+
+    def legal_actions(self):
+        return RoundState.legal_actions(self)
+
+    def raise_bounds(self):
+        return RoundState.raise_bounds(self)
+
+    def proceed_street(self):
+        '''
+        Advances to the next round of betting. Returns True at showdown, when the round is over.
+        '''
+        if self.street == 5:
+            return True
+        self.push()
+        self.button = 1
+        self.street = 3 if self.street == 0 else self.street + 1
+        self.pips[0] = self.pips[1] = 0
+        return False
+
+    def call(self):
+        '''
+        Applies a call by the active player. Returns True if the round is over.
+        '''
+        self.push()
+        if self.button == 0:  # sb calls bb
+            self.button = 1
+            self.pips[0] = self.pips[1] = BIG_BLIND
+            self.stacks[0] = self.stacks[1] = STARTING_STACK - BIG_BLIND
+            return False
+        # both players acted
+        active = self.button % 2
+        contribution = self.pips[1-active] - self.pips[active]
+        self.stacks[active] -= contribution
+        self.pips[active] += contribution
+        self.button += 1
+        return self.proceed_street()
+
+    def check(self):
+        '''
+        Applies a check by the active player. Returns True if the round is over.
+        '''
+        if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
+            return self.proceed_street()
+        # let opponent act
+        self.push()
+        self.button += 1
+        return False
+
+    def raise_to(self, amount):
+        '''
+        Applies a raise to amount by the active player.
+        '''
+        self.push()
+        active = self.button % 2
+        contribution = amount - self.pips[active]
+        self.stacks[active] -= contribution
+        self.pips[active] += contribution
+        self.button += 1
+        return False
+
+    def proceed(self, action):
+        '''
+        Applies one action by the active player. Returns True if the round is over.
+        '''
+        if isinstance(action, FoldAction):
+            return True
+        if isinstance(action, CallAction):
+            return self.call()
+        if isinstance(action, CheckAction):
+            return self.check()
+        # isinstance(action, RaiseAction)
+        return self.raise_to(action.amount)
@@ -0,0 +1,52 @@
+'''
+Per-board ranking of every live two-card combo.
+
+When a street's board is known, a BoardIndex scores all two-card combos that do not use
+a board card once and keeps the scores sorted. Any hand's counts of better, tied and
+worse opponent combos are then two binary searches, less the combos that share a card
+with the hand.
+'''
+import eval7
+import numpy as np
+
+from evaluator import HandState
+from skeleton.cards import EVAL7_CARDS, card_mask
+
+ALL_COMBOS = np.array([(card1, card2) for card1 in range(52) for card2 in range(card1 + 1, 52)], dtype=np.int64)
+
+
+class BoardIndex():
+    '''
+    The live combos of one board, their scores and the scores in sorted order.
+    '''
+
+    def __init__(self, board):
+        self.board = list(board)
+        self.board_mask = card_mask(board)
+        combo_masks = (np.int64(1) << ALL_COMBOS[:, 0]) | (np.int64(1) << ALL_COMBOS[:, 1])
+        live = (combo_masks & self.board_mask) == 0
+        self.combos = ALL_COMBOS[live]
+        self.combo_masks = combo_masks[live]
+        self.scores = HandState.of(self.combos).merge(HandState.of(self.board)).value()
+        self.sorted_scores = np.sort(self.scores)
+
+    def counts(self, hand):
+        '''
+        Returns (better, tied, worse): the opponent combos, among those that share no card
+        with hand (two card ints), that beat, tie and lose to it on this board.
+        '''
+        score = eval7.evaluate([EVAL7_CARDS[card] for card in self.board + list(hand)])
+        low = int(np.searchsorted(self.sorted_scores, score, 'left'))
+        high = int(np.searchsorted(self.sorted_scores, score, 'right'))
+        conflicts = self.scores[(self.combo_masks & card_mask(hand)) != 0]
+        better = len(self.sorted_scores) - high - int(np.count_nonzero(conflicts > score))
+        tied = high - low - int(np.count_nonzero(conflicts == score))
+        worse = low - int(np.count_nonzero(conflicts < score))
+        return better, tied, worse
+
+    def percentile(self, hand):
+        '''
+        Returns the fraction of live opponent combos that hand beats or ties.
+        '''
+        better, tied, worse = self.counts(hand)
+        return 1 - better / (better + tied + worse)
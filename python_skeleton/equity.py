@@ -0,0 +1,148 @@
+'''
+Equity of a hand against a random or weighted range, within a time cap.
+
+- River: exact, one call to eval7's range routine.
+- Turn: exact over every river card, in a fixed shuffled order. Against the random
+  range, the evaluator states of our hand and every opponent combo absorb
+  RIVER_CHUNK rivers at a time and are scored in one batch; against other ranges,
+  one eval7 call per river. If the time cap comes first, the
+  rivers done so far are a uniform sample of them.
+- Flop and preflop: eval7's Monte Carlo, with as many iterations as fit in the cap.
+
+Each call is capped at the earlier of the decision's Deadline (see skeleton/budget.py)
+and target seconds, so the game clock sets the sample counts and no call runs much past
+target; p99() reports the latency actually seen. Ranges are eval7.HandRange objects,
+which may be weighted, e.g. HandRange('JJ+, AT+, 80%(A8s+)'); on the turn the equity is
+averaged over river cards.
+'''
+from collections import deque
+import random
+import time
+
+import eval7
+import numpy as np
+
+from combo_index import ALL_COMBOS
+from evaluator import CARD_CODES, HandState, load_tables
+from skeleton.cards import CARD_BITS, card_mask, to_eval7, EVAL7_CARDS
+
+RANDOM_RANGE = eval7.HandRange('22+, A2+, K2+, Q2+, J2+, T2+, 92+, 82+, 72+, 62+, 52+, 42+, 32')
+RIVER_ORDER = list(range(52))
+random.Random(0).shuffle(RIVER_ORDER)
+RIVER_CHUNK = 8  # rivers per batch against the random range
+COMBO_MASKS = (np.int64(1) << ALL_COMBOS[:, 0]) | (np.int64(1) << ALL_COMBOS[:, 1])
+COMBO_CODES = CARD_CODES[ALL_COMBOS[:, 0]] + CARD_CODES[ALL_COMBOS[:, 1]]
+
+
+class EquityEngine():
+    '''
+    Computes equities and keeps the latencies of the last window calls.
+
+    Monte Carlo iteration counts come from a per-call overhead measured when the engine
+    is created and a per-iteration cost, and the turn loop stops one river early from
+    the cost of a river; both costs are tracked as the match goes, since other processes
+    compete for the CPU.
+    '''
+
+    def __init__(self, target=0.010, min_iterations=200, max_iterations=20000, window=1000):
+        self.target = target
+        self.min_iterations = min_iterations
+        self.max_iterations = max_iterations
+        self.latencies = deque(maxlen=window)
+        load_tables()  # build or map the evaluator's tables before any decision is timed
+        hole = to_eval7([12, 25])
+        start_time = time.perf_counter()
+        eval7.py_hand_vs_range_monte_carlo(hole, RANDOM_RANGE, [], 1)
+        self.call_overhead = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        eval7.py_hand_vs_range_monte_carlo(hole, RANDOM_RANGE, [], 5000)
+        self.seconds_per_iteration = max(time.perf_counter() - start_time - self.call_overhead, 1e-4) / 5000
+        self.seconds_per_river = self.call_overhead
+        self.seconds_per_chunk = self.call_overhead
+
+    def equity(self, hand, board, deadline=None, hand_range=RANDOM_RANGE):
+        '''
+        Returns (equity, exact) of hand against hand_range on board, both lists of card
+        ints, with ties counting half.
+        '''
+        start_time = time.perf_counter()
+        end = start_time + self.target
+        if deadline is not None:
+            end = min(end, deadline.end)
+        hole = to_eval7(hand)
+        board_cards = to_eval7(board)
+        if len(board) == 5:
+            result = eval7.py_hand_vs_range_exact(hole, hand_range, board_cards), True
+        elif len(board) == 4:
+            result = self.turn_equity(hand, board, hand_range, end)
+        else:
+            result = self.monte_carlo(hole, board_cards, hand_range, end)
+        self.latencies.append(time.perf_counter() - start_time)
+        return result
+
+    def turn_equity(self, hand, board, hand_range, end):
+        '''
+        Averages the exact river equity over the river cards, or those that fit before end.
+        '''
+        dead_mask = card_mask(hand) | card_mask(board)
+        rivers = [card for card in RIVER_ORDER if not dead_mask & CARD_BITS[card]]
+        if hand_range is RANDOM_RANGE:
+            return self.random_turn_equity(hand, board, dead_mask, rivers, end)
+        hole = to_eval7(hand)
+        board_cards = to_eval7(board)
+        total = 0.
+        done = 0
+        start_time = time.perf_counter()
+        for card in rivers:
+            if done and time.perf_counter() + self.seconds_per_river >= end:
+                break
+            total += eval7.py_hand_vs_range_exact(hole, hand_range, board_cards + [EVAL7_CARDS[card]])
+            done += 1
+        self.seconds_per_river = 0.8 * self.seconds_per_river + 0.2 * (time.perf_counter() - start_time) / done
+        return total / done, done == len(rivers)
+
+    def random_turn_equity(self, hand, board, dead_mask, rivers, end):
+        '''
+        turn_equity against the random range, scoring RIVER_CHUNK rivers per batch.
+        '''
+        live = (COMBO_MASKS & dead_mask) == 0
+        board_state = HandState.of(board)
+        ours = board_state.merge(HandState.of(hand))
+        theirs = board_state.merge(HandState(2, COMBO_CODES[live], COMBO_MASKS[live]))
+        total = 0.
+        done = 0
+        start_time = time.perf_counter()
+        for first in range(0, len(rivers), RIVER_CHUNK):
+            if done and time.perf_counter() + self.seconds_per_chunk >= end:
+                break
+            chunk = np.array(rivers[first:first + RIVER_CHUNK], dtype=np.int64)
+            our_values = ours.add(chunk).value()
+            rows, columns = np.nonzero((theirs.mask[None, :] & (np.int64(1) << chunk)[:, None]) == 0)
+            their_values = theirs.take(columns).add(chunk[rows]).value()
+            points = (their_values < our_values[rows]) + 0.5 * (their_values == our_values[rows])
+            total += float((np.bincount(rows, points) / np.bincount(rows)).sum())
+            done += len(chunk)
+        chunks = -(-done // RIVER_CHUNK)
+        self.seconds_per_chunk = 0.8 * self.seconds_per_chunk + 0.2 * (time.perf_counter() - start_time) / chunks
+        return total / done, done == len(rivers)
+
+    def monte_carlo(self, hole, board_cards, hand_range, end):
+        '''
+        Estimates the equity with as many Monte Carlo iterations as fit before end.
+        '''
+        start_time = time.perf_counter()
+        seconds = end - start_time - self.call_overhead
+        iterations = max(self.min_iterations, min(self.max_iterations, int(seconds / self.seconds_per_iteration)))
+        equity = eval7.py_hand_vs_range_monte_carlo(hole, hand_range, board_cards, iterations)
+        seconds_per_iteration = max(time.perf_counter() - start_time - self.call_overhead, 0.) / iterations
+        self.seconds_per_iteration = 0.8 * self.seconds_per_iteration + 0.2 * max(seconds_per_iteration, 1e-8)
+        return equity, False
+
+    def p99(self):
+        '''
+        Returns the 99th percentile latency of the recent calls, in seconds.
+        '''
+        if not self.latencies:
+            return 0.
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
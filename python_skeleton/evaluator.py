@@ -0,0 +1,291 @@
+'''
+Batch hand evaluator for arrays of card ints, with eval7's hand values.
+
+Cards are ints 0-51, suit * 13 + rank. evaluate() scores an (n, k) array of 5 to 7 card
+hands and evaluate_board() a shared board plus an (n, 2) array of hole cards; both
+return exactly what eval7.evaluate returns for the same cards, so results mix freely.
+A HandState absorbs cards one at a time across streets and scores every next card at
+once.
+
+Lookup tables do the work, with no Python-level step per hand:
+
+- Rank multisets. A hand's rank counts are coded in base 5, split into the low ranks
+  (2 to 8) and the high ranks (9 to A). Per hand size, the low code indexes the start
+  of a block of values and the high code the offset into it, so every 5, 6 and 7 card
+  multiset has one slot holding its best non-flush value.
+- Flushes. A hand has at most one suit with five or more cards; each suit's 13-bit
+  rank mask indexes the flush (or straight flush) value, 0 below five cards.
+
+The tables are built on first use, in about a second, and saved in one .npy file next
+to this module, which later processes memory-map instead of rebuilding.
+'''
+import itertools
+import os
+
+import numpy as np
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+LOW_RANKS = range(7)
+HIGH_RANKS = range(7, 13)
+LOW_CODES = 5 ** len(LOW_RANKS)
+HIGH_CODES = 5 ** len(HIGH_RANKS)
+CARD_CODES = 5 ** (np.arange(52, dtype=np.int64) % 13)
+CARD_BITS = np.int64(1) << np.arange(52, dtype=np.int64)
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_FILE = 'evaluator_tables.npy'
+
+# OFFSETS OF THE PACKED TABLES: LOW BASES PER HAND SIZE, HIGH RANKS, FLUSHES, VALUES
+HIGH_OFFSET = 3 * LOW_CODES
+FLUSH_OFFSET = HIGH_OFFSET + HIGH_CODES
+VALUES_OFFSET = FLUSH_OFFSET + (1 << 13)
+
+low_bases = None
+high_ranks = None
+flush_values = None
+rank_values = None
+
+
+def straight_high(mask):
+    '''
+    Returns the top rank of the best straight in a 13-bit rank mask, or -1.
+    '''
+    wheel = (mask << 1) | ((mask >> 12) & 1)  # the ace also plays low
+    for high in range(12, 2, -1):
+        run = 0b11111 << (high - 3)
+        if wheel & run == run:
+            return high
+    return -1
+
+
+def kicker_bits(ranks, shifts):
+    '''
+    Packs ranks, highest first, into the nibbles at shifts.
+    '''
+    value = 0
+    for rank, shift in zip(ranks, shifts):
+        value |= rank << shift
+    return value
+
+
+def rank_value(counts):
+    '''
+    Returns eval7's value of the best non-flush five cards with these rank counts.
+    '''
+    mask = sum(1 << rank for rank in range(13) if counts[rank])
+    by_count = {count: [rank for rank in range(12, -1, -1) if counts[rank] >= count] for count in (1, 2, 3, 4)}
+    quads = [rank for rank in range(12, -1, -1) if counts[rank] == 4]
+    trips = [rank for rank in range(12, -1, -1) if counts[rank] == 3]
+    pairs = [rank for rank in range(12, -1, -1) if counts[rank] == 2]
+    if quads:
+        kicker = [rank for rank in by_count[1] if rank != quads[0]][:1]
+        return (QUADS << 24) | (quads[0] << 16) | kicker_bits(kicker, (12,))
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return (FULL_HOUSE << 24) | (trips[0] << 16) | (pair << 12)
+    high = straight_high(mask)
+    if high >= 0:
+        return (STRAIGHT << 24) | (high << 16)
+    if trips:
+        kickers = [rank for rank in by_count[1] if rank != trips[0]][:2]
+        return (TRIPS << 24) | (trips[0] << 16) | kicker_bits(kickers, (12, 8))
+    if len(pairs) >= 2:
+        kicker = [rank for rank in by_count[1] if rank not in pairs[:2]][:1]
+        return (TWO_PAIR << 24) | (pairs[0] << 16) | (pairs[1] << 12) | kicker_bits(kicker, (8,))
+    if pairs:
+        kickers = [rank for rank in by_count[1] if rank != pairs[0]][:3]
+        return (PAIR << 24) | (pairs[0] << 16) | kicker_bits(kickers, (12, 8, 4))
+    return (HIGH_CARD << 24) | kicker_bits(by_count[1][:5], (16, 12, 8, 4, 0))
+
+
+def flush_value(mask):
+    '''
+    Returns eval7's value of the best flush in a 13-bit rank mask of one suit, or 0.
+    '''
+    ranks = [rank for rank in range(12, -1, -1) if mask >> rank & 1]
+    if len(ranks) < 5:
+        return 0
+    high = straight_high(mask)
+    if high >= 0:
+        return (STRAIGHT_FLUSH << 24) | (high << 16)
+    return (FLUSH << 24) | kicker_bits(ranks[:5], (16, 12, 8, 4, 0))
+
+
+def multisets(ranks):
+    '''
+    Returns the rank multisets, as count tuples, of up to 7 cards over ranks, at most 4 each.
+    '''
+    return [counts for counts in itertools.product(range(5), repeat=len(ranks)) if sum(counts) <= 7]
+
+
+def code_of(counts):
+    return sum(count * 5 ** position for position, count in enumerate(counts))
+
+
+def build_tables():
+    '''
+    Returns the tables packed in one int32 array, at the offsets above.
+    '''
+    low_sets = multisets(LOW_RANKS)
+    high_sets = multisets(HIGH_RANKS)
+    high_rank = np.zeros(HIGH_CODES, dtype=np.int32)
+    high_by_size = {size: [] for size in range(8)}
+    for counts in high_sets:
+        high_rank[code_of(counts)] = len(high_by_size[sum(counts)])
+        high_by_size[sum(counts)].append(counts)
+    bases = np.zeros((3, LOW_CODES), dtype=np.int32)
+    values = []
+    for size in (5, 6, 7):
+        for low in low_sets:
+            if sum(low) > size:
+                continue
+            bases[size - 5, code_of(low)] = len(values)
+            values.extend(rank_value(low + high) for high in high_by_size[size - sum(low)])
+    flushes = np.array([flush_value(mask) for mask in range(1 << 13)], dtype=np.int32)
+    return np.concatenate([bases.ravel(), high_rank, flushes, np.array(values, dtype=np.int32)])
+
+
+def load_tables():
+    '''
+    Loads the tables, memory-mapped from TABLE_DIR, building and saving them if needed.
+    '''
+    global low_bases, high_ranks, flush_values, rank_values
+    path = os.path.join(TABLE_DIR, TABLE_FILE)
+    try:
+        tables = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        tables = build_tables()
+        try:
+            partial = '%s.%d' % (path, os.getpid())  # both pokerbots may build at once
+            with open(partial, 'wb') as table_file:
+                np.save(table_file, tables)
+            os.replace(partial, path)
+        except OSError:
+            pass  # a read-only directory only costs a rebuild per process
+    tables = np.asarray(tables)  # a plain view of the map: memmap indexing is slow per element
+    low_bases = tables[:HIGH_OFFSET].reshape(3, LOW_CODES)
+    high_ranks = tables[HIGH_OFFSET:FLUSH_OFFSET]
+    flush_values = tables[FLUSH_OFFSET:FLUSH_OFFSET + (1 << 13)]
+    rank_values = tables[VALUES_OFFSET:]
+
+
+def evaluate_codes(size, codes, masks):
+    '''
+    Returns the values of hands of size cards given their rank codes (sums of CARD_CODES)
+    and card masks (sums of CARD_BITS), both (n,) arrays. Callers that reuse partial sums
+    across many hands can skip evaluate's gathers.
+    '''
+    if rank_values is None:
+        load_tables()
+    high, low = np.divmod(codes, LOW_CODES)
+    values = rank_values[low_bases[size - 5][low] + high_ranks[high]]
+    for shift in (0, 13, 26, 39):
+        np.maximum(values, flush_values[(masks >> shift) & 0x1FFF], out=values)
+    return values
+
+
+def combine(tables, cards):
+    '''
+    Returns the sums of tables over the columns of an (n, k) array of card ints.
+    '''
+    columns = np.ascontiguousarray(cards.T)
+    total = tables[columns[0]].copy()
+    for column in columns[1:]:
+        total += tables[column]
+    return total
+
+
+def evaluate(cards):
+    '''
+    Returns eval7's values for an (n, k) array of hands of 5 to 7 distinct card ints.
+    '''
+    cards = np.asarray(cards, dtype=np.intp)
+    return evaluate_codes(cards.shape[1], combine(CARD_CODES, cards), combine(CARD_BITS, cards))
+
+
+def evaluate_board(board, holes):
+    '''
+    Returns eval7's values for a shared board of 3 to 5 card ints plus each row of an
+    (n, 2) array of hole cards.
+    '''
+    board = np.asarray(board, dtype=np.intp)
+    holes = np.asarray(holes, dtype=np.intp)
+    codes = combine(CARD_CODES, holes) + CARD_CODES[board].sum()
+    masks = combine(CARD_BITS, holes) + CARD_BITS[board].sum()
+    return evaluate_codes(len(board) + 2, codes, masks)
+
+
+class HandState():
+    '''
+    The cards absorbed so far by one hand, or a batch of hands, as the rank code and card
+    mask that evaluate_codes takes: ints for one hand, (n,) arrays for a batch. Absorbing
+    a card adds its entries of the CARD_CODES and CARD_BITS transition tables, so each
+    street extends the previous one in O(1) and all continuations score in one call:
+
+        flop = HandState.of(hole + board)
+        turn = flop.add(turn_card)
+        rivers, values = turn.continuations()  # every live river card
+
+    A card must not already be in the state it is added to.
+    '''
+    __slots__ = ('size', 'code', 'mask')
+
+    def __init__(self, size=0, code=0, mask=0):
+        self.size = size
+        self.code = code
+        self.mask = mask
+
+    @classmethod
+    def of(cls, cards):
+        '''
+        Returns the state of a list of card ints, or the batch of an (n, k) array of them.
+        '''
+        if np.ndim(cards) == 1:
+            cards = [int(card) for card in cards]
+            return cls(len(cards), sum(5 ** (card % 13) for card in cards), sum(1 << card for card in cards))
+        cards = np.asarray(cards, dtype=np.intp)
+        return cls(cards.shape[1], combine(CARD_CODES, cards), combine(CARD_BITS, cards))
+
+    def add(self, cards):
+        '''
+        Returns the state with one more card: a card int, or an (n,) array of them, one per
+        hand of a batch or, added to a single hand, the batch of its continuations.
+        '''
+        if np.ndim(cards) == 0:
+            card = int(cards)
+            return HandState(self.size + 1, self.code + 5 ** (card % 13), self.mask + (1 << card))
+        return HandState(self.size + 1, self.code + CARD_CODES[cards], self.mask + CARD_BITS[cards])
+
+    def merge(self, other):
+        '''
+        Returns the state of this state's cards and other's together, for disjoint cards;
+        one of them may be a batch.
+        '''
+        return HandState(self.size + other.size, self.code + other.code, self.mask + other.mask)
+
+    def take(self, indices):
+        '''
+        Returns the hands of a batch at indices, an index array or a boolean mask.
+        '''
+        return HandState(self.size, self.code[indices], self.mask[indices])
+
+    def value(self):
+        '''
+        Returns eval7's value of a hand of 5 to 7 cards, or an (n,) array for a batch.
+        '''
+        if np.ndim(self.code):
+            return evaluate_codes(self.size, self.code, self.mask)
+        if rank_values is None:
+            load_tables()
+        high, low = divmod(int(self.code), LOW_CODES)  # one hand: plain ints beat array overhead
+        mask = int(self.mask)
+        return max(rank_values.item(low_bases.item(self.size - 5, low) + high_ranks.item(high)),
+                   flush_values.item(mask & 0x1FFF), flush_values.item((mask >> 13) & 0x1FFF),
+                   flush_values.item((mask >> 26) & 0x1FFF), flush_values.item(mask >> 39))
+
+    def continuations(self, dead_mask=0):
+        '''
+        Returns (cards, values) for one hand: the cards neither in it nor in dead_mask, and
+        the value of the hand with each of them added.
+        '''
+        cards = np.flatnonzero((CARD_BITS & (int(self.mask) | dead_mask)) == 0)
+        return cards, self.add(cards).value()
@@ -5,12 +5,25 @@ from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
 from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
+from skeleton.cards import EVAL7_CARDS, CARD_BITS, to_eval7
+from skeleton.budget import Budget
 from skeleton.runner import parse_args, run_bot
+from strength import StrengthCache, canonical_key
+from combo_index import BoardIndex
+from equity import EquityEngine
+from evaluator import HandState
 
 import random
 import eval7
 import numpy as np
 import sys
+import time
+
+# every two card combination, in a fixed shuffled order so a partial pass is a fair sample
+COMBOS = [(card1, card2, CARD_BITS[card1] | CARD_BITS[card2]) for card1 in range(52) for card2 in range(card1 + 1, 52)]
+random.Random(0).shuffle(COMBOS)
+COMBO_CHUNK = 64  # combinations evaluated between deadline checks
+STRENGTH_STORE = 'strength.cache'  # relative strengths persisted across matches; None keeps them in memory only
 
 
 class Player(Bot):
@@ -130,6 +143,24 @@ class Player(Bot):
 
         self.previous_street_strength = 0.0  # Add this line
 
+        # Split the game clock into time slices for each decision
+        self.budget = Budget()
+        self.deadline = None
+
+        # River relative strength counts by suit-isomorphic (hole, board) spot
+        self.strength_cache = StrengthCache(path=STRENGTH_STORE)
+
+        # Ranking of every live combo on the river board, and how long the last one took to build
+        self.board_index = None
+        self.index_build_time = 0.
+
+        # Our hole cards and the board so far, absorbed one card at a time
+        self.hand_cards = None
+        self.hand_state = None
+
+        # Equity against a random hand, capped per call
+        self.equity_engine = EquityEngine()
+
     def handle_new_round(self, game_state, round_state, active):
         '''
         Called when a new round starts.
@@ -154,6 +185,9 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
+        self.budget.end_round()
+        if game_state.round_num % 100 == 0:
+            print(f"Equity p99 latency: {self.equity_engine.p99() * 1000:.2f}ms", file=sys.stderr)
         my_delta = terminal_state.deltas[active]  # your bankroll change from this round
         previous_state = terminal_state.previous_state  # RoundState before payoffs
         street = previous_state.street  # 0, 3, 4, or 5 representing when this round ended
@@ -161,12 +195,42 @@ class Player(Bot):
         opp_cards = previous_state.hands[1-active]  # opponent's cards or [] if not revealed
         opponent_bounty = terminal_state.bounty_hits # True if opponent hit bounty
 
+    def get_board_index(self, board):
+        '''
+        Returns the BoardIndex of board (card ints), reused across decisions on one board.
+        '''
+        if self.board_index is None or self.board_index.board != board:
+            start_time = time.perf_counter()
+            self.board_index = BoardIndex(board)
+            self.index_build_time = time.perf_counter() - start_time
+        return self.board_index
+
+    def get_hand_state(self, hand, board):
+        '''
+        Returns the evaluator HandState of hand and board (card ints), extending the
+        previous street's state with the new board cards when board extends it.
+        '''
+        cards = list(hand) + list(board)
+        if self.hand_cards != cards:
+            hand_state = self.hand_state
+            if hand_state is not None and cards[:len(self.hand_cards)] == self.hand_cards:
+                for card in cards[len(self.hand_cards):]:
+                    hand_state = hand_state.add(card)
+            else:
+                hand_state = HandState.of(cards)
+            self.hand_cards = cards
+            self.hand_state = hand_state
+        return self.hand_state
+
     def get_action(self, game_state, round_state, active):
         '''
         Where the magic happens - your code should implement this function.
         Called any time the engine needs an action from your bot.
         '''
         street = round_state.street
+        self.deadline = self.budget.start(game_state, street)
+        if self.deadline.exhausted:  # no time left to think: take the free option
+            return CheckAction() if CheckAction in round_state.legal_actions() else FoldAction()
         print(f"\n=== Action Decision ===", file=sys.stderr)
         print(f"Round: {game_state.round_num}/{NUM_ROUNDS}", file=sys.stderr)  # Added round number
         print(f"Street: {street}", file=sys.stderr)
@@ -237,7 +301,7 @@ class Player(Bot):
             hand_stats = self.hand_strength.get(hand_key, [30.0, 169, 99.0])
             range_percentile = hand_stats[2]
             
-            has_bounty = bounty_rank in [card[0] for card in cards]
+            has_bounty = round_state.card_state().bounty_hit(active, bounty_rank)
             
             print(f"Range percentile: {range_percentile}", file=sys.stderr)
             print(f"Has bounty: {has_bounty}", file=sys.stderr)
@@ -443,38 +507,53 @@ class Player(Bot):
 
         def evaluate_hand_and_board():
             """
-            Evaluates hand strength and board texture
+            Evaluates hand strength and board texture; before the river, relative_strength is
+            the equity against a random hand, otherwise the made hand's rank among live combos
             Returns: (hand_value, hand_type, board_type, relative_strength, board_favor)
             """
-            hole_cards = [eval7.Card(card) for card in round_state.hands[active]]
-            board_cards = [eval7.Card(card) for card in round_state.deck[:round_state.street]]
-            
-            # Basic hand strength
-            all_cards = hole_cards + board_cards
-            hand_value = eval7.evaluate(all_cards)
-            
-            # Calculate relative hand strength
-            # Generate all possible two card combinations
-            deck = []
-            ranks = '23456789TJQKA'
-            suits = 'hdcs'
-            for rank in ranks:
-                for suit in suits:
-                    card_str = rank + suit
-                    if eval7.Card(card_str) not in all_cards:  # Skip cards we can see
-                        deck.append(eval7.Card(card_str))
-            
-            # Generate all possible opponent hands
-            possible_hands = 0
-            better_hands = 0
-            for i in range(len(deck)):
-                for j in range(i + 1, len(deck)):
-                    possible_hands += 1
-                    opp_value = eval7.evaluate(board_cards + [deck[i], deck[j]])
-                    if opp_value > hand_value:
-                        better_hands += 1
-            
-            relative_strength = 1 - (better_hands / possible_hands) if possible_hands > 0 else 1
+            cards = round_state.card_state()
+            board_cards = to_eval7(cards.board[:round_state.street])
+            
+            # Basic hand strength, from the previous street's evaluator state
+            hand_value = self.get_hand_state(cards.hands[active], cards.board[:round_state.street]).value()
+            
+            if round_state.street < 5:
+                # Before the river, decide on equity over the runouts rather than the made hand
+                relative_strength, exact = self.equity_engine.equity(cards.hands[active], cards.board, self.deadline)
+                print(f"Equity vs random: {relative_strength:.2%} ({'exact' if exact else 'sampled'})", file=sys.stderr)
+            else:
+                # Calculate relative hand strength against every possible opponent hand,
+                # or as many as fit in this decision's time slice
+                # Suit-isomorphic spots share one cached count
+                strength_key = canonical_key(cards.hand_masks[active], cards.board_mask)
+                counts = self.strength_cache.get(strength_key)
+                if counts is not None:
+                    better_hands, possible_hands = counts
+                elif self.deadline.remaining() >= self.index_build_time:
+                    # Rank our hand among every live combo on this board
+                    better, tied, worse = self.get_board_index(cards.board).counts(cards.hands[active])
+                    better_hands, possible_hands = better, better + tied + worse
+                    self.strength_cache.put(strength_key, (better_hands, possible_hands))
+                else:
+                    # Not enough time left to index the board: sample opponent hands instead
+                    dead_mask = cards.dead_mask(active)
+                    possible_hands = 0
+                    better_hands = 0
+                    for start in range(0, len(COMBOS), COMBO_CHUNK):
+                        if start and self.deadline.expired():
+                            print(f"Time slice expired after {possible_hands} opponent hands", file=sys.stderr)
+                            break
+                        for card1, card2, combo_mask in COMBOS[start:start + COMBO_CHUNK]:
+                            if dead_mask & combo_mask:  # Skip cards we can see
+                                continue
+                            possible_hands += 1
+                            opp_value = eval7.evaluate(board_cards + [EVAL7_CARDS[card1], EVAL7_CARDS[card2]])
+                            if opp_value > hand_value:
+                                better_hands += 1
+                    else:  # only exact counts are cached
+                        self.strength_cache.put(strength_key, (better_hands, possible_hands))
+            
+                relative_strength = 1 - (better_hands / possible_hands) if possible_hands > 0 else 1
             
             # Convert hand value to hand type
             hand_types = {
@@ -50,3 +50,20 @@ class Bot():
         Your action.
         '''
         raise NotImplementedError('get_action')
+
+    def ponder(self, game_state, round_state, active):
+        '''
+        Optional. Called after every response to the engine, while it waits on your
+        opponent or deals the next round, to start background work (see ponder.py).
+
+        Arguments:
+        game_state: the GameState object.
+        round_state: the RoundState object, or None between rounds.
+        active: your player's index.
+
+        Returns:
+        A generator whose steps run in a worker thread until the next packet arrives,
+        or None. Returning the generator from the previous call resumes it; anything
+        else cancels it.
+        '''
+        return None
@@ -0,0 +1,121 @@
+'''
+Cache of the river's relative strength, keyed up to suit isomorphism.
+
+Relative strength (how many live opponent combos beat our hand on the board) does not
+change when suits are relabelled, so (hole, board) spots are keyed by the sorted
+per-suit pairs of (board ranks, hole ranks). Repeat decisions on a river and the many
+rounds that share a canonical spot become lookups. Earlier streets decide on equity
+instead, so they never reach the cache.
+
+Entries live in an in-memory LRU and, optionally, in a memory-mapped open-addressing
+table on disk that persists across matches. Each disk record carries a check word, so
+a record torn by a concurrent writer (forked pokerbots share the file) reads as a miss.
+'''
+from collections import OrderedDict
+import os
+
+import numpy as np
+
+RANK_MASK = (1 << 13) - 1
+RECORD = np.dtype([('key_high', '<u8'), ('key_low', '<u8'), ('value', '<u4'), ('check', '<u4')])
+MAX_PROBES = 16
+
+
+def canonical_key(hand_mask, board_mask):
+    '''
+    Returns the suit-isomorphism-canonical key of a hand and board, given as 52-bit masks.
+    '''
+    pairs = sorted((((board_mask >> shift) & RANK_MASK) << 13) | ((hand_mask >> shift) & RANK_MASK)
+                   for shift in (0, 13, 26, 39))
+    return (pairs[0] << 78) | (pairs[1] << 52) | (pairs[2] << 26) | pairs[3]
+
+
+def check_word(key_high, key_low, value):
+    return ((key_high * 0x9E3779B1) ^ (key_low * 0x85EBCA77) ^ (value * 0xC2B2AE3D)) & 0xFFFFFFFF
+
+
+class StrengthCache():
+    '''
+    Maps canonical keys to (better, possible): the opponent combos that beat us and all
+    live opponent combos.
+
+    capacity bounds the LRU. With a path, misses fall through to a table of slots
+    records (a power of two) memory-mapped from that file, created if needed.
+    '''
+
+    def __init__(self, capacity=4096, path=None, slots=1 << 18):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.table = None
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            try:
+                mode = 'r+' if os.path.exists(path) and os.path.getsize(path) == slots * RECORD.itemsize else 'w+'
+                self.table = np.memmap(path, dtype=RECORD, mode=mode, shape=(slots,))
+            except OSError:
+                self.table = None  # run without the disk store rather than fail the match
+
+    def slots(self, key_high, key_low):
+        '''
+        Yields the table slots to probe for a key.
+        '''
+        mask = len(self.table) - 1
+        start = (key_high * 0x9E3779B97F4A7C15 ^ key_low) & mask
+        for probe in range(MAX_PROBES):
+            yield (start + probe) & mask
+
+    def get(self, key):
+        '''
+        Returns (better, possible) for a canonical key, or None.
+        '''
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.table is not None:
+            key_high, key_low = key >> 64, key & 0xFFFFFFFFFFFFFFFF
+            for slot in self.slots(key_high, key_low):
+                record = self.table[slot]
+                if record['key_high'] == 0 and record['key_low'] == 0:
+                    break
+                if record['key_high'] == key_high and record['key_low'] == key_low:
+                    packed = int(record['value'])
+                    if int(record['check']) != check_word(key_high, key_low, packed):
+                        break
+                    value = (packed >> 16, packed & 0xFFFF)
+                    self.remember(key, value)
+                    self.hits += 1
+                    return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        '''
+        Stores (better, possible) for a canonical key. Only store exact counts.
+        '''
+        self.remember(key, value)
+        if self.table is not None:
+            key_high, key_low = key >> 64, key & 0xFFFFFFFFFFFFFFFF
+            packed = (value[0] << 16) | value[1]
+            for slot in self.slots(key_high, key_low):
+                record = self.table[slot]
+                empty = record['key_high'] == 0 and record['key_low'] == 0
+                if empty or (record['key_high'] == key_high and record['key_low'] == key_low):
+                    self.table[slot] = (key_high, key_low, packed, check_word(key_high, key_low, packed))
+                    return
+            # the probe sequence is full: the spot stays in memory only
+
+    def remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def flush(self):
+        '''
+        Writes the disk store's changes back to its file.
+        '''
+        if self.table is not None:
+            self.table.flush()
@@ -0,0 +1,46 @@
+'''
+Blocks cut short by the sequential test.
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+from engine import Game, DealStream
+from test_headless import CheckingPlayer
+
+
+class StopAfter():
+    '''
+    Stands in for early_stop.SequentialTest, deciding after a fixed number of rounds.
+    '''
+
+    def __init__(self, num_rounds):
+        self.num_rounds = num_rounds
+
+    def update(self, delta):
+        self.num_rounds -= 1
+        return self.num_rounds == 0
+
+    def describe(self, player_1_name, player_2_name):
+        return 'decided'
+
+
+def final_order(tmp_path, num_rounds, early_stop):
+    game = Game(str(tmp_path / 'gamelog.{}.{}'.format(num_rounds, early_stop)))
+    game.early_stop = StopAfter(num_rounds) if early_stop else None
+    players = [CheckingPlayer(name, str(tmp_path / (name + '.txt'))) for name in 'AB']
+    players = game.run_rounds(players, 1, num_rounds if not early_stop else 100, DealStream(5))
+    game.log.close()
+    for player in players:
+        player.player_log.close()
+    return [player.name for player in players], len(game.deltas)
+
+
+def test_early_stop_returns_full_block_order(tmp_path):
+    for num_rounds in (3, 4):
+        order, played = final_order(tmp_path, num_rounds, True)
+        assert played == num_rounds
+        assert (order, played) == final_order(tmp_path, num_rounds, False)
@@ -0,0 +1,29 @@
+'''
+Hand history records written by the engine.
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+import hand_history
+from engine import Game, DealStream
+from hand_history import HandHistoryWriter
+from test_headless import CheckingPlayer
+
+
+def test_seed_beyond_64_bits_is_recorded(tmp_path):
+    seed = 2 ** 70 + 12345
+    game = Game(str(tmp_path / 'gamelog'))
+    game.hand_history = HandHistoryWriter(str(tmp_path / 'gamelog.hh'))
+    players = [CheckingPlayer(name, str(tmp_path / (name + '.txt'))) for name in 'AB']
+    game.run_rounds(players, 1, 4, DealStream(seed))
+    game.log.close()
+    game.hand_history.close()
+    for player in players:
+        player.player_log.close()
+    records = hand_history.load(str(tmp_path / 'gamelog.hh'))
+    assert list(records['round']) == [1, 2, 3, 4]
+    assert (records['seed'] == seed & (2 ** 63 - 1)).all()
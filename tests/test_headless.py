@@ -0,0 +1,105 @@
+'''
+Headless pokerbots must see what their socket Runner would build from the same match.
+
+A check-or-call pokerbot plays a seeded match in process, and a stand-in with the same
+policy plays it again while recording the engine's packets, which are replayed through
+the skeleton Runner. Seats alternate every round, so both seats are compared.
+'''
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+from engine import Player, InProcessPlayer, Game, DealStream, TerminalState, CallAction, CheckAction, import_pokerbot
+from replay import ReplayFile
+
+POKERBOT = '''
+from skeleton.actions import CallAction, CheckAction
+from skeleton.bot import Bot
+from skeleton.runner import run_bot
+
+
+class Player(Bot):
+    def __init__(self):
+        self.results = []
+
+    def handle_new_round(self, game_state, round_state, active):
+        pass
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        self.results.append((game_state.round_num, active, list(terminal_state.deltas),
+                             list(terminal_state.bounty_hits), terminal_state.previous_state.hands))
+
+    def get_action(self, game_state, round_state, active):
+        return CheckAction() if CheckAction in round_state.legal_actions() else CallAction()
+'''
+
+
+class RecordingPlayer(Player):
+    '''
+    Plays check-or-call in memory and records the packets the engine would have sent.
+    '''
+
+    def __init__(self, name, log_filename):
+        super().__init__(name, '.', log_filename)
+        self.packets = []
+
+    def query(self, round_state, player_message, game_log):
+        player_message[0] = 'T{:.3f}'.format(self.game_clock)
+        self.packets.append(' '.join(player_message))
+        del player_message[1:]
+        if isinstance(round_state, TerminalState) or CheckAction in round_state.legal_actions():
+            return CheckAction()
+        return CallAction()
+
+
+class CheckingPlayer(RecordingPlayer):
+    '''
+    The opponent: check-or-call, nothing recorded.
+    '''
+
+    def query(self, round_state, player_message, game_log):
+        action = super().query(round_state, player_message, game_log)
+        del self.packets[:]
+        return action
+
+
+@pytest.fixture
+def pokerbot_path(tmp_path):
+    path = tmp_path / 'pokerbot'
+    shutil.copytree(os.path.join(ROOT, 'python_skeleton', 'skeleton'), path / 'skeleton')
+    (path / 'player.py').write_text(POKERBOT)
+    return str(path)
+
+
+def play(tmp_path, hero, num_rounds=60, seed=11):
+    game = Game(str(tmp_path / ('gamelog.' + hero.name)))
+    opponent = CheckingPlayer('B', str(tmp_path / 'B.txt'))
+    game.run_rounds([hero, opponent], 1, num_rounds, DealStream(seed))
+    game.log.close()
+    hero.player_log.close()
+    opponent.player_log.close()
+
+
+def test_headless_round_over_matches_runner(tmp_path, pokerbot_path):
+    headless = InProcessPlayer('A', pokerbot_path, str(tmp_path / 'A.txt'))
+    headless.build()
+    headless.run()
+    play(tmp_path, headless)
+
+    recorder = RecordingPlayer('R', str(tmp_path / 'R.txt'))
+    play(tmp_path, recorder)
+    player_module, _ = import_pokerbot(pokerbot_path)
+    runner_class = player_module.run_bot.__globals__['Runner']  # import_pokerbot evicts the skeleton modules
+    pokerbot = player_module.Player()
+    runner_class(pokerbot, ReplayFile(recorder.packets + ['Q'])).run()
+
+    assert {active for _, active, _, _, _ in pokerbot.results} == {0, 1}
+    assert any(any(hits) for _, _, _, hits, _ in pokerbot.results)
+    assert headless.pokerbot.results == pokerbot.results
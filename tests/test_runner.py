@@ -0,0 +1,35 @@
+'''
+The skeleton Runner's packet parsing.
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+os.chdir(ROOT)  # engine reads config.py from the working directory
+
+from engine import import_pokerbot
+from replay import ReplayFile
+
+
+def test_runner_ignores_unknown_clauses():
+    player_module, _ = import_pokerbot(os.path.join(ROOT, 'default'))
+    runner_class = player_module.run_bot.__globals__['Runner']  # import_pokerbot evicts the skeleton modules
+    actions = []
+
+    class CheckingBot(player_module.Bot):
+        def handle_new_round(self, game_state, round_state, active):
+            pass
+
+        def handle_round_over(self, game_state, terminal_state, active):
+            pass
+
+        def get_action(self, game_state, round_state, active):
+            actions.append(round_state.street)
+            return player_module.CheckAction() if player_module.CheckAction in round_state.legal_actions() \
+                else player_module.CallAction()
+
+    packets = ['Z9', 'T60.000 P1 HAc,Kd G2 C Xfuture', 'T59.900 K B2c,3d,4h Wnew', 'Q']
+    runner_class(CheckingBot(), ReplayFile(packets)).run()
+    assert actions == [0, 3]